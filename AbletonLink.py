@@ -1,8 +1,80 @@
 import aalink as link
-from time import sleep
+import threading
+from time import monotonic, perf_counter
+from Instrumentation import DISABLED
+
+# Beats of a bar in the Link session; beats are aligned without moving the
+# bar position by more than half a beat
+QUANTUM = 4
+
+
+def resolve_tempo_setter(session):
+    """Function setting the tempo of an aalink.Link, for the API this aalink version has, or None."""
+    # captureSessionState (newer aalink versions)
+    if hasattr(session, 'captureSessionState'):
+        def set_tempo(bpm: float) -> None:
+            state = session.captureSessionState()
+            state.setTempo(bpm, session.clock().micros())
+            session.commitSessionState(state)
+        return set_tempo
+    # setTempo directly
+    if hasattr(session, 'setTempo'):
+        return session.setTempo
+    # tempo property
+    if hasattr(session, 'tempo'):
+        def set_tempo(bpm: float) -> None:
+            session.tempo = bpm
+        return set_tempo
+    return None
+
+
+def resolve_beat_aligner(session):
+    """Function aligning the beats of an aalink.Link on a detected beat, for the API this aalink version has, or None.
+
+    The function align(beat_time, accept) takes the perf_counter time of
+    a beat and finds the phase error of the session at that time, in beats
+    (-0.5 to 0.5). When accept(error) is true, the nearest session beat is
+    forced onto beat_time for every peer. It returns whether it was.
+    """
+    # Session state with a clock (newer aalink versions): the beat time is
+    # converted to Link clock microseconds against perf_counter, read together
+    if hasattr(session, 'captureSessionState') and hasattr(session, 'clock'):
+        def align(beat_time: float, accept) -> bool:
+            state = session.captureSessionState()
+            micros = session.clock().micros() - int((perf_counter() - beat_time) * 1e6)
+            beat = state.beatAtTime(micros, QUANTUM)
+            if not accept(beat - round(beat)):
+                return False
+            state.forceBeatAtTime(round(beat), micros, QUANTUM)
+            session.commitSessionState(state)
+            return True
+        return align
+    # Current beat and force_beat (asyncio aalink): the beat is forced now,
+    # shifted by the error found at beat_time
+    if hasattr(session, 'force_beat') and hasattr(session, 'beat') and hasattr(session, 'tempo'):
+        def align(beat_time: float, accept) -> bool:
+            beat = session.beat - (perf_counter() - beat_time) * session.tempo / 60
+            error = beat - round(beat)
+            if not accept(error):
+                return False
+            session.force_beat(session.beat - error)
+            return True
+        return align
+    return None
+
 
 class AbletonLink:
-    def __init__(self):
+    def __init__(self, threshold: float = 0.05, min_interval: float = 0.25, instrumentation=DISABLED,
+                 phase_threshold: float = 0.01, max_phase_age: float = 2.0):
+        """Ableton Link session whose tempo and beat phase are published from a thread of its own.
+
+        Args:
+            threshold: smallest change in BPM from the published tempo worth publishing
+            min_interval: shortest time in seconds between two publications
+            instrumentation: Instrumentation counting published and dropped tempos
+            phase_threshold: smallest beat phase error in seconds worth correcting
+            max_phase_age: oldest beat in seconds the phase is still aligned on
+        """
         # aalink.Link expects two arguments: bpm and an optional loop object.
         # Pass None for the loop to use the default behavior.
         self.link = link.Link(120.00, None)
@@ -20,6 +92,30 @@ class AbletonLink:
         except Exception:
             pass
 
+        # The API is probed once; set_bpm only hands the tempo over
+        self.set_tempo = resolve_tempo_setter(self.link)
+        if self.set_tempo is None:
+            print("⚠️  No suitable method found to set BPM in aalink.Link")
+        self.align_beats = resolve_beat_aligner(self.link)
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.instrumentation = instrumentation
+        # Handed over by the analyzer's thread, taken by the publisher's
+        self.pending = None
+        self.pending_beat = None
+        self.pending_lock = threading.Lock()
+        self.phase_threshold = phase_threshold
+        self.max_phase_age = max_phase_age
+        # Phase error in beats of the previous beat, not corrected yet
+        self.phase_error = None
+        self.published = None
+        self.published_at = None
+        self.last_error = None
+        self.updated = threading.Event()
+        self.stopping = threading.Event()
+        self.publisher = threading.Thread(target=self._publish, daemon=True)
+        self.publisher.start()
+
     def enable(self, enabled: bool) -> None:
         """Enable or disable the Ableton Link instance.
 
@@ -36,30 +132,106 @@ class AbletonLink:
                     self.link.setEnabled(enabled)
                 except Exception:
                     pass
+        if enabled:
+            # Publish the next tempo whatever it is
+            self.published = None
+            self.phase_error = None
 
     def get_num_peers(self) -> int:
         """Get the number of connected Ableton Link peers."""
         return self.link.num_peers
 
     def set_bpm(self, bpm: float) -> None:
-        """Set the BPM in Ableton Link.
-        
-        Try multiple approaches to set tempo depending on aalink API version.
+        """Hand a tempo to the publisher thread; never blocks.
+
+        Tempos arriving faster than the publisher sends them replace each
+        other, only the latest is published.
         """
+        with self.pending_lock:
+            if self.pending is not None:
+                self.instrumentation.count("link_coalesced")
+            self.pending = bpm
+        self.updated.set()
+
+    def set_beat(self, beat_time: float) -> None:
+        """Hand the perf_counter time of a detected beat to the publisher thread; never blocks.
+
+        The session's beats are aligned on it after the pending tempo is
+        published, unless the beat is older than max_phase_age by then. A
+        phase error is only corrected once two beats in a row agree on it,
+        so that one misplaced beat never moves the peers.
+        """
+        with self.pending_lock:
+            self.pending_beat = beat_time
+        self.updated.set()
+
+    def close(self) -> None:
+        """Stop the publisher thread."""
+        self.stopping.set()
+        self.updated.set()
+        self.publisher.join()
+
+    def _publish(self) -> None:
+        while True:
+            self.updated.wait()
+            if self.stopping.is_set():
+                return
+            # Rate limit: let newer tempos replace this one meanwhile
+            if self.published_at is not None:
+                remaining = self.published_at + self.min_interval - monotonic()
+                if remaining > 0 and self.stopping.wait(remaining):
+                    return
+            self.updated.clear()
+            # A tempo and its beat arriving meanwhile are taken together
+            with self.pending_lock:
+                bpm, self.pending = self.pending, None
+                beat_time, self.pending_beat = self.pending_beat, None
+            if bpm is not None and self.set_tempo is not None:
+                self._publish_tempo(bpm)
+            # Beats are extrapolated at the published tempo
+            if beat_time is not None and self.align_beats is not None and self.published is not None:
+                self._publish_beat(beat_time)
+
+    def _publish_tempo(self, bpm: float) -> None:
+        if self.published is not None and abs(bpm - self.published) < self.threshold:
+            self.instrumentation.count("link_below_threshold")
+            return
+        try:
+            self.set_tempo(bpm)
+            self.published, self.published_at = bpm, monotonic()
+            self.instrumentation.count("link_published")
+            self.last_error = None
+        except Exception as e:
+            # Printed once until a tempo gets through again
+            if str(e) != self.last_error:
+                print(f"❌ Error setting BPM in Ableton Link: {e}")
+            self.last_error = str(e)
+
+    def _publish_beat(self, beat_time: float) -> None:
+        # An old beat extrapolates the tempo error over many beats
+        if perf_counter() - beat_time > self.max_phase_age:
+            self.instrumentation.count("link_phase_stale")
+            return
+        threshold = self.phase_threshold * self.published / 60
+        stats = self.instrumentation
+
+        def accept(error: float) -> bool:
+            stats.record("link_phase_error", abs(error) * 60 / self.published)
+            previous, self.phase_error = self.phase_error, error
+            if abs(error) < threshold:
+                stats.count("link_phase_within_threshold")
+                return False
+            if previous is None or abs(error - previous) >= threshold:
+                stats.count("link_phase_unconfirmed")
+                return False
+            return True
+
         try:
-            # Approche 1: captureSessionState (newer aalink versions)
-            if hasattr(self.link, 'captureSessionState'):
-                s = self.link.captureSessionState()
-                link_time = self.link.clock().micros()
-                s.setTempo(bpm, link_time)
-                self.link.commitSessionState(s)
-            # Approche 2: setTempo directement
-            elif hasattr(self.link, 'setTempo'):
-                self.link.setTempo(bpm)
-            # Approche 3: tempo property
-            elif hasattr(self.link, 'tempo'):
-                self.link.tempo = bpm
-            else:
-                print("No suitable method found to set BPM in aalink.Link")
+            if self.align_beats(beat_time, accept):
+                self.phase_error = None
+                self.published_at = monotonic()
+                stats.count("link_phase_aligned")
         except Exception as e:
-            print(f"Error setting BPM in Ableton Link: {e}")
+            if str(e) != self.last_error:
+                print(f"❌ Error setting the beat phase in Ableton Link: {e}")
+            self.last_error = str(e)
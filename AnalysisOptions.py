@@ -0,0 +1,44 @@
+# Choices offered by the analyzer, kept free of heavy imports so that the
+# user interface can be built before numpy, scipy and the patterns load.
+
+# Predefined BPM range options: start BPM and width
+BPM_RANGES = {
+    "60–160": (60, 100),
+    "130–230": (130, 100),
+    "210–300": (210, 90),
+}
+# Search every range at once and keep the one with the strongest votes
+AUTO_RANGE = "Auto"
+
+# Tempo engines; only the pattern engine needs the pattern files
+PATTERN_ENGINE = "Pattern"
+AUTOCORRELATION_ENGINE = "Autocorrelation"
+TEMPO_ENGINES = [PATTERN_ENGINE, AUTOCORRELATION_ENGINE]
+
+
+def range_bounds(range_key: str) -> tuple:
+    """(start BPM, width) of a BPM_RANGES key or of a custom range like "85–95", or None."""
+    if range_key in BPM_RANGES:
+        return BPM_RANGES[range_key]
+    start, dash, end = range_key.replace("-", "–").partition("–")
+    try:
+        start, end = float(start), float(end)
+    except ValueError:
+        return None
+    # Patterns reach 10 BPM below the start of the range
+    if not dash or start <= 10 or end <= start:
+        return None
+    start, end = (int(value) if value.is_integer() else value for value in (start, end))
+    return start, end - start
+
+
+def parse_range(text: str) -> str:
+    """Range key for a user-given range: "auto", a BPM_RANGES key or a custom range (plain hyphen accepted), or None."""
+    text = text.strip()
+    if text.lower() == AUTO_RANGE.lower():
+        return AUTO_RANGE
+    bounds = range_bounds(text)
+    if bounds is None:
+        return None
+    start, width = bounds
+    return f"{start:g}–{start + width:g}"
@@ -0,0 +1,303 @@
+"""
+BpmAnalyzer in a worker process, so that analysis never holds the GIL of
+the process running the audio callback and the user interface
+
+The filtered capture ring lives in shared memory (AudioStreamer with
+shared=True); the worker attaches to it and reads it without copying the
+stream. The pattern tables are memory-mapped files, so the worker maps the
+same pages instead of copying them. Commands (range, engine, start, stop)
+go to the worker over a pipe and are acknowledged; every averaged BPM
+(and vote histogram, once asked for) comes back over a second pipe and is
+published to the outputs by a thread of the capture process.
+"""
+
+import sys
+import signal
+import threading
+import traceback
+import multiprocessing
+from time import perf_counter, sleep
+
+from BpmStorage import BpmStorage
+from RingBuffer import RingBuffer
+from Instrumentation import Instrumentation, DISABLED
+from AnalysisOptions import PATTERN_ENGINE
+
+
+class SharedRingReader:
+    """What BpmAnalyzer reads from AudioStreamer, for a ring written by another thread or process.
+
+    There is no callback to wake the reader: it polls the ring position
+    every poll seconds until a hop of new audio arrived since its last
+    read, up to a second or until interrupted() is true. Hops missed while
+    the analysis ran are coalesced like in AudioStreamer.
+    """
+    def __init__(self, ring: RingBuffer, hop: int, poll: float = 0.005, interrupted=None,
+                 instrumentation=DISABLED):
+        self.ring = ring
+        self.hop = hop
+        self.poll = poll
+        self.interrupted = interrupted or (lambda: False)
+        self.instrumentation = instrumentation
+        self.read_position = ring.position
+        self.buffer_time = 0.0  # When the newest samples of the last read were noticed
+        # The input latency is subtracted from beat times by ProcessAnalyzer
+        self.latency = 0.0
+
+    def reset(self) -> None:
+        """Only wait for the audio written from now on."""
+        self.read_position = self.ring.position
+
+    def get_buffer(self, filtered: bool = True) -> tuple:
+        return self.get_buffer_and_position(filtered=filtered)[0]
+
+    def get_buffer_and_position(self, since: int = None, filtered: bool = True) -> tuple:
+        """Latest filtered samples and the stream position at their end (only the filtered ring is shared)."""
+        deadline = perf_counter() + 1.0
+        while (self.ring.position - self.read_position < self.hop and perf_counter() < deadline
+               and not self.interrupted()):
+            sleep(self.poll)
+        self.buffer_time = perf_counter()
+        buffer, position = self.ring.latest(since=since)
+        missed = (position - self.read_position) // self.hop - 1
+        if missed > 0:
+            self.instrumentation.count("coalesced_hops", missed)
+        self.read_position = position
+        return buffer, position
+
+
+class WorkerModule:
+    """The `module` of the analyzer in the worker: the shared ring and a BPM storage of its own."""
+    def __init__(self, audio_streamer: SharedRingReader):
+        self.audio_streamer = audio_streamer
+        self.bpm_storage = BpmStorage()
+
+
+def run_worker(commands, results, ring_spec: dict, settings: dict) -> None:
+    """Worker process: analyze the shared ring while started, answering every command."""
+    if settings.pop("stdout_to_stderr"):
+        sys.stdout = sys.stderr
+    # Ctrl-C, and systemd's SIGTERM, reach the whole process group: only
+    # the parent's "close" command ends the worker
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_IGN)
+    ring = RingBuffer.attach(**ring_spec)
+    instrumentation = Instrumentation() if settings.pop("instrumentation") else DISABLED
+    reader = SharedRingReader(ring, settings.pop("hop"), settings.pop("poll"), commands.poll, instrumentation)
+    label = settings.pop("label")
+    try:
+        from BpmAnalizer import BpmAnalyzer
+        analyzer = BpmAnalyzer(WorkerModule(reader), instrumentation=instrumentation, **settings)
+    except (Exception, SystemExit) as e:
+        traceback.print_exc()
+        commands.send(("error", str(e) or type(e).__name__))
+        ring.close()
+        return
+    analyzer.label = label
+    # The beat phase of the estimate is known before the outputs are called
+    analyzer.add_output("result", lambda bpm: results.send(("bpm", (bpm, reader.buffer_time, analyzer.beat_phase))))
+    commands.send(("done", (analyzer.range_key, analyzer.engine)))
+
+    running = False
+    while True:
+        if running and not commands.poll():
+            try:
+                analyzer.analyze_step()
+            except Exception as e:
+                print(f"❌ Error in analysis process: {e}")
+                traceback.print_exc()
+                running = False
+                # The parent marks the analyzer stopped; a new "start" resumes it
+                results.send(("error", str(e)))
+            continue
+        command, argument = commands.recv()
+        reply = None
+        try:
+            if command == "range":
+                analyzer.change_bpm_pattern(argument)
+                reply = analyzer.range_key
+            elif command == "engine":
+                analyzer.change_engine(argument)
+                reply = analyzer.engine
+            elif command == "start":
+                reader.reset()
+                running = True
+            elif command == "stop":
+                running = False
+            elif command == "histograms":
+                if not analyzer.histogram_outputs:
+                    analyzer.add_histogram_output("result", lambda histogram: results.send(("histogram", histogram)))
+            elif command == "snapshot":
+                reply = instrumentation.snapshot()
+            elif command == "close":
+                commands.send(("done", None))
+                break
+            else:
+                raise ValueError(f"Unknown command: {command}")
+            commands.send(("done", reply))
+        except Exception as e:
+            traceback.print_exc()
+            commands.send(("error", str(e)))
+    ring.close()
+
+
+class ProcessAnalyzer:
+    """BpmAnalyzer running in a worker process, with the interface the app uses.
+
+    The module's AudioStreamer must keep its filtered ring in shared memory
+    (shared=True). Construction waits until the worker has loaded the
+    analyzer and its patterns; change_bpm_pattern and change_engine wait
+    until the worker has applied them.
+    """
+    def __init__(self, module, frame_rate: int = 11025, incremental: bool = False, window_seconds: float = 12,
+                 instrumentation=DISABLED, onsets: bool = False, engine: str = PATTERN_ENGINE,
+                 target_latency: float = None, poll: float = 0.005, label: str = ""):
+        self.module = module
+        self.label = label
+        self.outputs = []
+        self.phase_outputs = []
+        self.histogram_outputs = []
+        self.beat_phase = None
+        # Message of the error that stopped the worker's analysis, None while it runs
+        self.error = None
+        self.instrumentation = instrumentation
+        # One command and its reply at a time
+        self.lock = threading.Lock()
+        streamer = module.audio_streamer
+        ring = streamer.filtered_buffer
+        if ring.shared_memory is None:
+            raise ValueError("ProcessAnalyzer needs an AudioStreamer created with shared=True")
+        ring_spec = {"name": ring.shared_memory.name, "capacity": ring.capacity, "headroom": ring.headroom,
+                     "dtype": ring.dtype.str}
+        settings = {"frame_rate": frame_rate, "incremental": incremental, "window_seconds": window_seconds,
+                    "onsets": onsets, "engine": engine, "target_latency": target_latency,
+                    "instrumentation": instrumentation.enabled, "hop": streamer.hop, "poll": poll, "label": label,
+                    # Console messages go where the parent sends them (Daemon.py keeps stdout for JSON)
+                    "stdout_to_stderr": sys.stdout is sys.stderr}
+        # Forking a process running Tk and PortAudio threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.commands, worker_commands = context.Pipe()
+        self.results, worker_results = context.Pipe(duplex=False)
+        self.process = context.Process(target=run_worker, name="analysis", daemon=True,
+                                       args=(worker_commands, worker_results, ring_spec, settings))
+        self.process.start()
+        worker_commands.close()
+        worker_results.close()
+        with self.lock:
+            self.range_key, self.engine = self._reply()
+        threading.Thread(target=self._receive, daemon=True).start()
+        print(f"✅ {self.label}BPM analyzer process started (pid {self.process.pid})")
+
+    def add_output(self, name: str, set_bpm) -> None:
+        """Publish every averaged BPM with set_bpm(bpm_float), timed as stage name."""
+        self.outputs.append((name, set_bpm))
+
+    def add_phase_output(self, name: str, set_beat) -> None:
+        """Publish the time of the latest beat of every estimate with a phase (see BpmAnalyzer.add_phase_output)."""
+        self.phase_outputs.append((name, set_beat))
+
+    def add_histogram_output(self, name: str, set_histogram) -> None:
+        """Publish the vote histogram of every search (see BpmAnalyzer.add_histogram_output)."""
+        if not self.histogram_outputs:
+            self._request("histograms")
+        self.histogram_outputs.append((name, set_histogram))
+
+    def change_bpm_pattern(self, range_key: str) -> None:
+        self.range_key = self._request("range", range_key)
+
+    def change_engine(self, engine: str) -> None:
+        self.engine = self._request("engine", engine)
+
+    def snapshot(self) -> dict:
+        """Instrumentation snapshot of the worker (empty without instrumentation)."""
+        return self._request("snapshot")
+
+    def start_run_analyzer_thread(self, input_device_index: int) -> None:
+        """Start capture and the analysis in the worker."""
+        try:
+            self.module.audio_streamer.start_stream(input_device_index=input_device_index)
+            self.module.ableton_link.enable(True)
+            if self.error:
+                print(f"⚠️  {self.label}Restarting the BPM analysis after: {self.error}")
+            self.error = None
+            self._request("start")
+            print("✅ BPM analyzer process running with device index:", input_device_index)
+        except Exception as e:
+            print(f"❌ Error starting analyzer: {e}")
+            traceback.print_exc()
+            raise
+
+    def stop_run_analyzer_thread(self) -> None:
+        """Stop the analysis in the worker, then capture. A worker that has exited counts as stopped."""
+        try:
+            try:
+                self._request("stop")
+            except RuntimeError:
+                self.process.join(timeout=1)
+                if self.process.is_alive():
+                    raise
+            self.module.audio_streamer.stop_stream()
+            self.module.ableton_link.enable(False)
+            print("✅ BPM analyzer process stopped.")
+        except Exception as e:
+            print(f"❌ Error stopping analyzer: {e}")
+            traceback.print_exc()
+
+    def close(self) -> None:
+        """End the worker process."""
+        try:
+            self._request("close")
+        except RuntimeError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.commands.close()
+
+    def _request(self, command: str, argument=None):
+        with self.lock:
+            try:
+                self.commands.send((command, argument))
+            except OSError:
+                raise RuntimeError("The analysis process has exited")
+            return self._reply()
+
+    def _reply(self):
+        try:
+            status, value = self.commands.recv()
+        except (EOFError, OSError):
+            raise RuntimeError("The analysis process has exited")
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def _receive(self) -> None:
+        """Publish the worker's BPM to the outputs, and its errors, until the worker exits."""
+        stats = self.instrumentation
+        storage = self.module.bpm_storage
+        while True:
+            try:
+                kind, result = self.results.recv()
+            except (EOFError, OSError):
+                return
+            if kind == "error":
+                self.error = result
+                print(f"❌ {self.label}BPM analysis stopped by an error in the worker: {result}")
+                continue
+            if kind == "histogram":
+                for name, set_histogram in self.histogram_outputs:
+                    with stats.stage(name):
+                        set_histogram(result)
+                continue
+            bpm, buffer_time, beat_phase = result
+            storage._float, storage._str = bpm, format(bpm, ".2f")
+            for name, set_bpm in self.outputs:
+                with stats.stage(name):
+                    set_bpm(bpm)
+            # perf_counter is the same clock in both processes
+            if beat_phase:
+                self.beat_phase = beat_phase._replace(time=beat_phase.time - self.module.audio_streamer.latency)
+                for name, set_beat in self.phase_outputs:
+                    with stats.stage(name):
+                        set_beat(self.beat_phase.time)
+            stats.record("capture_to_output", perf_counter() - buffer_time)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Headless BPM analysis of WAV files
+
+Usage:
+    python3 AnalyzeFiles.py track.wav                     # One file, CSV on stdout
+    python3 AnalyzeFiles.py music/*.wav --format json     # JSON lines
+    python3 AnalyzeFiles.py library/ --range 130-230 --workers 8
+    python3 AnalyzeFiles.py mix.wav --range auto          # Pick the range per window
+    python3 AnalyzeFiles.py set.wav --format json --curve --hop 1   # Tempo over time
+
+Results are printed as each file completes. Progress and the final
+throughput go to stderr so stdout stays machine-readable.
+"""
+
+import os
+import sys
+import csv
+import json
+import wave
+import argparse
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import gcd
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from scipy import signal
+
+from BpmAnalizer import BpmAnalyzer, BPM_RANGES, TEMPO_ENGINES
+from AnalysisOptions import parse_range
+
+FRAME_RATE = 11025
+FIELDS = ["file", "bpm", "estimates", "windows", "duration_s", "elapsed_ms", "error"]
+
+# One analyzer per worker process. Pattern files are memory-mapped, so the
+# workers share the same pages instead of each loading its own tables.
+_analyzer = None
+
+
+def read_wav(path: str, frame_rate: int = FRAME_RATE) -> np.ndarray:
+    """Decode a PCM WAV file to mono float samples (int16 scale) at frame_rate."""
+    with wave.open(str(path), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float64)
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((raw[:, 0] << 8 | raw[:, 1] << 16 | raw[:, 2] << 24) >> 8) / 256
+    elif width == 4:
+        samples = np.frombuffer(data, dtype="<i4") / 65536
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != frame_rate:
+        common = gcd(rate, frame_rate)
+        samples = signal.resample_poly(samples, frame_rate // common, rate // common)
+    return samples
+
+
+def init_worker(range_key: str, onsets: bool = False, engine: str = TEMPO_ENGINES[0]) -> None:
+    """Create this worker's analyzer; its start-up messages go to stderr."""
+    global _analyzer
+    with contextlib.redirect_stdout(sys.stderr):
+        _analyzer = BpmAnalyzer(None, frame_rate=FRAME_RATE, onsets=onsets, engine=engine)
+        _analyzer.change_bpm_pattern(range_key)
+
+
+def analyze_file(path: str, window_seconds: float = 12, hop_seconds: float = 6, curve: bool = False) -> dict:
+    """Median tempo of the detections over sliding windows of one file.
+
+    With curve, the result also holds the tempo of every window as
+    [time (s), bpm, confidence] (see BpmAnalyzer.search_bpm_curve).
+    """
+    started = perf_counter()
+    result = {"file": str(path), "bpm": None, "estimates": 0, "windows": 0, "duration_s": 0.0, "error": ""}
+    try:
+        samples = read_wav(path, _analyzer.frame_rate)
+        filtered = _analyzer.bandpass_filter(samples)
+        times, bpm, confidence = _analyzer.search_bpm_curve(filtered, window_seconds, hop_seconds)
+        estimates = bpm[bpm > 0]
+        result["windows"] = len(bpm)
+        result["duration_s"] = round(len(samples) / _analyzer.frame_rate, 2)
+        result["estimates"] = len(estimates)
+        if len(estimates):
+            result["bpm"] = round(float(np.median(estimates)), 2)
+        if curve:
+            result["curve"] = [[round(float(t), 3), float(b), None if np.isnan(c) else round(float(c), 3)]
+                               for t, b, c in zip(times, bpm, confidence)]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed_ms"] = round((perf_counter() - started) * 1000, 1)
+    return result
+
+
+def find_files(paths: list) -> list:
+    """Expand directories into the .wav files they contain."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() == ".wav"))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Detect the BPM of WAV files without audio hardware or GUI",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("paths", nargs="+", help="WAV files or directories")
+    parser.add_argument("--range", default="60–160",
+                        help="BPM range: " + ", ".join(BPM_RANGES) + ", a custom range like 85-95 (plain hyphen accepted) or auto")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="Output format")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--hop", type=float, default=6, help="Hop between windows in seconds (whole half seconds)")
+    parser.add_argument("--curve", action="store_true",
+                        help="Add the tempo of every window as [time, bpm, confidence] (JSON only)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset-envelope front end for beat events")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive); autocorrelation needs no pattern files")
+    args = parser.parse_args()
+
+    range_key = parse_range(args.range)
+    if range_key is None:
+        parser.error(f"unknown BPM range: {args.range}")
+    if args.hop * 2 < 1 or args.hop * 2 != round(args.hop * 2):
+        parser.error(f"--hop must be a whole number of half seconds, not {args.hop:g}")
+    if args.curve and args.format != "json":
+        parser.error("--curve needs --format json")
+    files = find_files(args.paths)
+
+    # Make sure pattern files exist before the workers map them
+    init_worker(range_key, args.onsets, args.engine)
+
+    writer = None
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDS)
+        writer.writeheader()
+
+    started = perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(range_key, args.onsets, args.engine)) as pool:
+            futures = [pool.submit(analyze_file, str(f), args.window, args.hop, args.curve) for f in files]
+            for future in as_completed(futures):
+                result = future.result()
+                if writer:
+                    writer.writerow(result)
+                else:
+                    print(json.dumps(result))
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("\n⚠️  Analysis interrupted by user", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error during batch analysis: {e}", file=sys.stderr)
+        traceback.print_exc()
+        sys.exit(1)
+
+    elapsed = perf_counter() - started
+    print(f"✅ {len(files)} file(s) in {elapsed:.2f} s ({len(files) / elapsed:.1f} files/s, "
+          f"{args.workers} workers)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
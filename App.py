@@ -1,43 +1,177 @@
+from time import perf_counter
+STARTED = perf_counter()
 
+# Only light modules are imported here so the window shows at once; numpy,
+# scipy, PyAudio, aalink and the patterns are loaded by load_modules().
 from UserInterface import UserInterface
-from UserInterface import BpmStorage
-from BpmAnalizer import BpmAnalyzer
-from AudioStreamer import AudioStreamer
-from AbletonLink import AbletonLink
+from BpmStorage import BpmStorage
+from Instrumentation import Instrumentation, DISABLED
+from AnalysisOptions import PATTERN_ENGINE
+from threading import Thread
+import multiprocessing
 import sys
 import traceback
 
 FRAME_RATE = 11025
+# Only analyze the audio captured since the previous estimate
+INCREMENTAL_ANALYSIS = False
+# Beat events from the onsets of a decimated envelope, weighted by strength,
+# instead of the loudest sample of every half second
+ONSET_FRONT_END = False
+# Tempo engine at start-up, also selectable in the UI. The autocorrelation
+# engine needs no pattern files, for machines short on memory.
+TEMPO_ENGINE = PATTERN_ENGINE
+# Capture and analysis timing. CAPTURE_BLOCK samples arrive per audio
+# callback (10240 is 0.93 s); the analyzer runs once ANALYSIS_HOP_SECONDS of
+# new audio arrived (None: every block), on the last ANALYSIS_WINDOW_SECONDS.
+# For low latency, e.g. 512, 0.25 and 8 (6 with the autocorrelation engine);
+# check a setting with benchmarks/latency.py.
+CAPTURE_BLOCK = 10240
+ANALYSIS_HOP_SECONDS = None
+ANALYSIS_WINDOW_SECONDS = 12
+# Capture at the device's own rate and channels, downmixed and decimated to
+# FRAME_RATE by the app (False: mono at FRAME_RATE, converted by the driver).
+# Only the first CAPTURE_CHANNELS input channels are mixed (None: all).
+NATIVE_CAPTURE = True
+CAPTURE_CHANNELS = 2
+# Link tempo updates: smaller changes (BPM) than LINK_THRESHOLD_BPM from the
+# published tempo are dropped, and at most one is sent per LINK_MIN_INTERVAL_SECONDS
+LINK_THRESHOLD_BPM = 0.05
+LINK_MIN_INTERVAL_SECONDS = 0.25
+# Align the beats of the Link session on the detected beats (pattern engine
+# only) when they are off by at least LINK_PHASE_THRESHOLD_SECONDS
+LINK_PHASE = True
+LINK_PHASE_THRESHOLD_SECONDS = 0.01
+# Warn when a BPM reaches Link later than this after its audio was captured
+TARGET_LATENCY_SECONDS = None
+# Run the analyzer in a worker process reading the capture ring from shared
+# memory, so heavy analysis cannot delay the audio callback or the window
+ANALYSIS_PROCESS = False
+# Save the raw capture with its block timestamps, e.g. "capture.bpmcap", to
+# replay it later with Daemon.py --replay or benchmarks/replay.py
+RECORD_CAPTURE = None
+# Live vote histogram and tempogram under the controls (pattern engine only)
+TEMPO_VIEW = True
+# Per-stage timings of the capture and analysis, read with
+# modules.instrumentation.snapshot() and optionally appended to a file
+INSTRUMENTATION = False
+INSTRUMENTATION_DUMP = None  # e.g. "instrumentation.jsonl"
+INSTRUMENTATION_DUMP_INTERVAL = 10.0
 
 class InitialiseModules:
-    """Initialize all application modules."""
+    """Initialize all application modules.
+
+    The window comes up first; audio, Ableton Link and the analyzer with
+    the patterns of the default range are initialized in the background,
+    and the UI enables Activate once they are ready. Startup metrics
+    (seconds since launch) are printed, kept in startup_metrics and, with
+    instrumentation, recorded as startup_* stages.
+    """
     def __init__(self):
         try:
+            self.startup_metrics = {}
+            self.load_error = None
+            self.tempo_engine = TEMPO_ENGINE
+            self.show_tempo_view = TEMPO_VIEW
+            self.audio_streamer = None
+            self.ableton_link = None
+            self.bpm_analyzer = None
+
             print("Initializing BpmStorage...")
             self.bpm_storage = BpmStorage()
             
+            self.instrumentation = Instrumentation() if INSTRUMENTATION else DISABLED
+            if INSTRUMENTATION and INSTRUMENTATION_DUMP:
+                self.instrumentation.start_dump(INSTRUMENTATION_DUMP, INSTRUMENTATION_DUMP_INTERVAL)
+
+            print("Creating user interface...")
+            self.ui = UserInterface(self)
+            self.ui.root.after(0, self.startup_mark, "first_window")
+
+            Thread(target=self.load_modules, daemon=True).start()
+            self.ui.start()
+            self.close()
+            if self.load_error:
+                sys.exit(1)
+            
+        except Exception as e:
+            print(f"❌ Fatal initialization error: {e}")
+            traceback.print_exc()
+            sys.exit(1)
+
+    def load_modules(self) -> None:
+        """Heavy imports and initialization, off the Tk thread."""
+        try:
             print("Initializing AudioStreamer...")
-            self.audio_streamer = AudioStreamer(FRAME_RATE)
+            from AudioStreamer import AudioStreamer
+            self.audio_streamer = AudioStreamer(FRAME_RATE, ANALYSIS_WINDOW_SECONDS, self.instrumentation,
+                                                CAPTURE_BLOCK, ANALYSIS_HOP_SECONDS, shared=ANALYSIS_PROCESS,
+                                                native=NATIVE_CAPTURE, max_channels=CAPTURE_CHANNELS)
+            if RECORD_CAPTURE:
+                self.audio_streamer.start_recording(RECORD_CAPTURE)
+            self.startup_mark("devices")
             
             print("Initializing AbletonLink...")
-            self.ableton_link = AbletonLink()
+            from AbletonLink import AbletonLink
+            self.ableton_link = AbletonLink(LINK_THRESHOLD_BPM, LINK_MIN_INTERVAL_SECONDS, self.instrumentation,
+                                            LINK_PHASE_THRESHOLD_SECONDS)
             
             print("Initializing BpmAnalyzer...")
-            self.bpm_analyzer = BpmAnalyzer(self, frame_rate=FRAME_RATE)
-            
-            print("Creating user interface...")
-            self.ui = UserInterface(self)
+            if ANALYSIS_PROCESS:
+                from AnalysisProcess import ProcessAnalyzer as BpmAnalyzer
+            else:
+                from BpmAnalizer import BpmAnalyzer
+            bpm_analyzer = BpmAnalyzer(self, frame_rate=FRAME_RATE, incremental=INCREMENTAL_ANALYSIS,
+                                       instrumentation=self.instrumentation, onsets=ONSET_FRONT_END,
+                                       engine=TEMPO_ENGINE, window_seconds=ANALYSIS_WINDOW_SECONDS,
+                                       target_latency=TARGET_LATENCY_SECONDS)
+            bpm_analyzer.add_output("link", self.ableton_link.set_bpm)
+            if LINK_PHASE:
+                bpm_analyzer.add_phase_output("link_phase", self.ableton_link.set_beat)
+            bpm_analyzer.add_output("ui", self.ui.set_bpm)
+            if TEMPO_VIEW:
+                bpm_analyzer.add_histogram_output("ui_votes", self.ui.set_histogram)
+            bpm_analyzer.add_output("startup", self.first_bpm)
+            self.bpm_analyzer = bpm_analyzer
+            self.startup_mark("analyzer_ready")
             
             print("✅ All modules initialized successfully")
-            self.ui.start()
-            
-        except Exception as e:
+        except (Exception, SystemExit) as e:
+            # The UI polls load_error and closes the window
             print(f"❌ Fatal initialization error: {e}")
             traceback.print_exc()
-            sys.exit(1)
+            self.load_error = str(e) or type(e).__name__
+
+    def close(self) -> None:
+        """Release the analysis process and shared memory once the window is closed."""
+        try:
+            if hasattr(self.bpm_analyzer, "close"):
+                self.bpm_analyzer.close()
+            if self.audio_streamer is not None:
+                self.audio_streamer.close()
+        except Exception as e:
+            print(f"❌ Error closing modules: {e}")
+            traceback.print_exc()
+
+    def startup_mark(self, name: str) -> None:
+        """Record a startup metric: seconds from launch to now."""
+        if name in self.startup_metrics:
+            return
+        elapsed = perf_counter() - STARTED
+        self.startup_metrics[name] = round(elapsed, 3)
+        self.instrumentation.record(f"startup_{name}", elapsed)
+        print(f"✅ Startup: {name} after {elapsed:.3f} s")
 
+    def first_bpm(self, bpm: float) -> None:
+        if "first_bpm" not in self.startup_metrics:
+            self.startup_mark("first_bpm")
+            activated = self.startup_metrics.get("activated")
+            if activated is not None:
+                print(f"✅ Startup: first BPM {self.startup_metrics['first_bpm'] - activated:.3f} s after Activate")
 
 if __name__ == "__main__":
+    # Needed by the analysis process in frozen executables
+    multiprocessing.freeze_support()
     try:
         InitialiseModules()
     except Exception as e:
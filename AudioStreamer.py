@@ -1,29 +1,40 @@
 import pyaudio
-import struct
 import numpy as np
-import threading
-from collections import deque
 import traceback
 import sys
+from Instrumentation import DISABLED
+from CaptureSource import CaptureSource
+from Decimator import StreamingDecimator, downmix
 
 
-class AudioStreamer:
+class AudioStreamer(CaptureSource):
     """Audio stream handler with PyAudio."""
-    def __init__(self, frame_rate: int = 11025, operating_range_seconds: int = 12):
+    def __init__(self, frame_rate: int = 11025, operating_range_seconds: int = 12, instrumentation=DISABLED,
+                 chunk: int = 10240, hop_seconds: float = None, shared: bool = False, native: bool = True,
+                 max_channels: int = 2):
         """Initialize audio streamer with error handling.
 
         Args:
-            frame_rate: sample rate in Hz (default 11025)
+            frame_rate: sample rate in Hz of the analysis (default 11025)
             operating_range_seconds: how many seconds of signal to keep in buffer
+            instrumentation: Instrumentation recording callback and buffer timings
+            chunk: samples at frame_rate per PortAudio callback; small blocks lower the latency
+            hop_seconds: new audio needed before the analyzer is woken (default: one chunk)
+            shared: keep the filtered ring in shared memory, for an analyzer in another process
+            native: capture at the device's default rate and channels, downmixed and
+                decimated to frame_rate here, instead of mono at frame_rate from the driver
+            max_channels: how many of the device's first input channels to capture and
+                mix (default 2, e.g. the main of a mixer; None: all)
         """
         try:
-            self.frame_rate = frame_rate
+            super().__init__(frame_rate, operating_range_seconds, instrumentation, chunk, hop_seconds, shared)
             self.format = pyaudio.paInt16
-            self.chunk = 10240
+            self.native = native
+            self.max_channels = max_channels
+            # Format of the running stream; see native_format
+            self.channels = 1
+            self.decimator = None
             self.audio = pyaudio.PyAudio()
-            self.signal_buffer = deque(maxlen=int(frame_rate * operating_range_seconds))
-            self.operating_range_seconds = operating_range_seconds
-            self.buffer_updated = threading.Event()
             self.stream = None
             self.stopping = False  # Flag to stop callback
             print("✅ AudioStreamer initialized successfully")
@@ -38,11 +49,13 @@ class AudioStreamer:
             # Check if we should stop
             if self.stopping:
                 return (None, pyaudio.paAbort)
-            
-            num_int16_values = len(in_data) // 2
-            signal_buffer_int = struct.unpack(f"<{num_int16_values}h", in_data)
-            self.signal_buffer.extend(signal_buffer_int)
-            self.buffer_updated.set()
+
+            samples = np.frombuffer(in_data, dtype="<i2")
+            if self.decimator or self.channels > 1:
+                with self.instrumentation.stage("decimate"):
+                    samples = downmix(samples, self.channels)
+                    samples = self.decimator.process(samples) if self.decimator else np.rint(samples).astype(np.int16)
+            self.write_block(samples, bool(status & pyaudio.paInputOverflow))
             return (None, pyaudio.paContinue)
         except Exception as e:
             print(f"❌ Error in audio callback: {e}")
@@ -55,35 +68,52 @@ class AudioStreamer:
             if input_device_index is None:
                 raise ValueError("No audio device selected")
 
+            self.reset()
+            rate, self.channels = self.native_format(input_device_index) if self.native else (self.frame_rate, 1)
+            self.decimator = StreamingDecimator(rate, self.frame_rate) if rate != self.frame_rate else None
+            # Callbacks last as long as chunk samples at frame_rate, and never
+            # give the rings more than that
+            frames = max(self.chunk * self.decimator.down // self.decimator.up, 1) if self.decimator else self.chunk
+
             self.stream = self.audio.open(
                 format=self.format,
-                channels=1,
-                rate=self.frame_rate,
+                channels=self.channels,
+                rate=rate,
                 input=True,
-                frames_per_buffer=self.chunk,
+                frames_per_buffer=frames,
                 input_device_index=input_device_index,
                 stream_callback=self.audio_callback,
                 start=False,
             )
             self.stream.start_stream()
-            print(f"✅ Audio stream started with device {input_device_index}")
+            # Dates the beats found in the buffer (BpmAnalyzer.phase_at)
+            self.latency = self.stream.get_input_latency() + (self.decimator.delay if self.decimator else 0)
+            print(f"✅ Audio stream started with device {input_device_index} "
+                  f"({rate} Hz, {self.channels} channel{'s' if self.channels > 1 else ''})")
         except Exception as e:
             print(f"❌ Error starting stream: {e}")
             traceback.print_exc()
             raise
 
-    def get_buffer(self) -> np.ndarray:
-        """Get audio buffer with error handling."""
+    def native_format(self, input_device_index: int) -> tuple:
+        """(rate, channels) the device captures at natively, if it can be brought to frame_rate.
+
+        Falls back to mono at frame_rate, converted by the driver, for
+        devices slower than frame_rate or rejecting their own format.
+        """
+        info = self.audio.get_device_info_by_index(input_device_index)
+        rate = int(round(info.get("defaultSampleRate", 0)))
+        channels = min(int(info.get("maxInputChannels", 1)), self.max_channels or 1 << 16)
+        if rate < self.frame_rate or channels < 1:
+            return self.frame_rate, 1
         try:
-            # Wait for data with short timeout to allow fast shutdown
-            self.buffer_updated.wait(timeout=1.0)
-            buffer = np.array(self.signal_buffer, dtype=np.int16)
-            self.buffer_updated.clear()
-            return buffer
-        except Exception as e:
-            print(f"❌ Error retrieving buffer: {e}")
-            traceback.print_exc()
-            raise
+            self.audio.is_format_supported(rate, input_device=input_device_index, input_channels=channels,
+                                           input_format=self.format)
+        except ValueError as e:
+            print(f"⚠️  Device {input_device_index} rejects {rate} Hz with {channels} channels ({e}), "
+                  f"capturing mono at {self.frame_rate} Hz")
+            return self.frame_rate, 1
+        return rate, channels
 
     def stop_stream(self):
         """Stop audio stream with error handling."""
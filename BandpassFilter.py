@@ -0,0 +1,36 @@
+import numpy as np
+from functools import lru_cache
+from scipy import signal
+
+
+@lru_cache(maxsize=None)
+def butter_bandpass_sos(frame_rate: int, lowcut: float = 60.0, highcut: float = 3000.0, order: int = 6) -> np.ndarray:
+    """Butterworth band-pass in second-order sections, designed once per parameter set."""
+    nyq = 0.5 * frame_rate
+    return signal.butter(order, [lowcut / nyq, highcut / nyq], btype="band", output="sos")
+
+
+def bandpass_filter(audio_signal: np.ndarray, frame_rate: int, lowcut: float = 60.0, highcut: float = 3000.0, order: int = 6) -> np.ndarray:
+    """Filter a whole signal from rest, as int16."""
+    sos = butter_bandpass_sos(frame_rate, lowcut, highcut, order)
+    return signal.sosfilt(sos, audio_signal).astype("int16")
+
+
+class StreamingBandpass:
+    """Band-pass filter applied chunk by chunk, each sample filtered once.
+
+    The filter state carries from one chunk to the next, so a stream
+    filtered in chunks equals the whole stream filtered at once.
+    """
+    def __init__(self, frame_rate: int, lowcut: float = 60.0, highcut: float = 3000.0, order: int = 6):
+        self.sos = butter_bandpass_sos(frame_rate, lowcut, highcut, order)
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart from rest, e.g. when the stream restarts."""
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Filter the next chunk, as int16."""
+        filtered, self.zi = signal.sosfilt(self.sos, samples, zi=self.zi)
+        return filtered.astype("int16")
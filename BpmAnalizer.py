@@ -1,21 +1,53 @@
 import numpy as np
-from scipy import signal
 import threading
-import ExtractBpmPatterns
+from collections import namedtuple
 from threading import Thread
 import traceback
 import sys
-from time import sleep
-from pathlib import Path
+from time import sleep, perf_counter
+from BpmPattern import BpmPattern
+from PatternStore import PatternStore, COARSE_STEP_BPM
+from IncrementalAnalysis import IncrementalAnalysis
+from Instrumentation import DISABLED
+from OnsetDetector import OnsetDetector
+from TempoEstimator import PatternEstimator, AutocorrelationEstimator
+from AnalysisOptions import BPM_RANGES, AUTO_RANGE, PATTERN_ENGINE, AUTOCORRELATION_ENGINE, TEMPO_ENGINES, range_bounds
+import BandpassFilter
 import PathUtils
 
 
+# In auto mode, the slowest range winner explaining at least this share of
+# the best one's beat events is kept
+AUTO_MARGIN = 0.85
 
+# Beat phase of an estimate: the first pattern beat, offset samples after the
+# start of the analyzed buffer, beats every period samples, and the
+# perf_counter time at which the latest of them in the buffer was captured
+BeatPhase = namedtuple("BeatPhase", "offset period time")
+
+# Coarse votes of a search decimated for display: votes[i] is the best vote
+# count of the tempos from first_bpm + i * step_bpm to the next bar
+VoteHistogram = namedtuple("VoteHistogram", "first_bpm step_bpm votes")
+# Tempo width of a histogram bar, in BPM
+HISTOGRAM_BPM = 1.0
 
 
 class BpmAnalyzer:
-    def __init__(self, module, frame_rate:int=11025, start_bpm:int=60, width:int=100, coarse_steps:int=440, fine_steps:int=2200):
+    def __init__(self, module, frame_rate:int=11025, start_bpm:int=60, width:int=100, coarse_steps:int=440, fine_steps:int=2200, incremental:bool=False, window_seconds:int=12, instrumentation=DISABLED, onsets:bool=False, engine:str=PATTERN_ENGINE, pattern_store:PatternStore=None, target_latency:float=None):
         self.module = module
+        # Prefix of the console messages, to tell sessions apart
+        self.label = ""
+        # (stage name, set_bpm) called with every averaged BPM; see add_output
+        self.outputs = []
+        # (stage name, set_beat) called with the time of the latest beat; see add_phase_output
+        self.phase_outputs = []
+        # (stage name, set_histogram) called with the votes of every search; see add_histogram_output
+        self.histogram_outputs = []
+        self.last_histogram = None
+        # (offset, period) in samples of the last pattern search, and its BeatPhase
+        self.last_beat = None
+        self.beat_phase = None
+        self.instrumentation = instrumentation
         self.frame_rate = frame_rate
         self.start_bpm = start_bpm
         self.width = width
@@ -23,82 +55,129 @@ class BpmAnalyzer:
         self.fine_steps = fine_steps
         self.lock = threading.Lock()
         self.stop_analyzer = threading.Event()
-        
-        # Get patterns directory (handles bundled vs interpreter)
-        self.patterns_dir = PathUtils.get_patterns_dir()
+        # Message of the error that ended the last run, None while it runs or after a clean stop
+        self.error = None
+        self.range_key = next((key for key, (start, _) in BPM_RANGES.items() if start == start_bpm), None)
+        # Seconds from capture to the outputs beyond which a BPM is late
+        self.target_latency = target_latency
+        self.late_warned = False
 
-        try:
-            pattern_60 = self.patterns_dir / "60_bpm_pattern.npy"
-            pattern_60_fine = self.patterns_dir / "60_bpm_pattern_fine.npy"
-            pattern_130 = self.patterns_dir / "130_bpm_pattern.npy"
-            pattern_130_fine = self.patterns_dir / "130_bpm_pattern_fine.npy"
-            pattern_210 = self.patterns_dir / "210_bpm_pattern.npy"
-            pattern_210_fine = self.patterns_dir / "210_bpm_pattern_fine.npy"
-            
-            self.BPM_PATTERN_60 = np.load(str(pattern_60))
-            self.BPM_PATTERN_FINE_60 = np.load(str(pattern_60_fine))
-            self.BPM_PATTERN_130 = np.load(str(pattern_130))
-            self.BPM_PATTERN_FINE_130 = np.load(str(pattern_130_fine))
-            self.BPM_PATTERN_210 = np.load(str(pattern_210))
-            self.BPM_PATTERN_FINE_210 = np.load(str(pattern_210_fine))
-        except FileNotFoundError:
-            print(f"⏳ Generating BPM patterns in {self.patterns_dir}...")
-            ExtractBpmPatterns.extract(self.frame_rate, str(self.patterns_dir))
-            self.BPM_PATTERN_60 = np.load(str(self.patterns_dir / "60_bpm_pattern.npy"))
-            self.BPM_PATTERN_FINE_60 = np.load(str(self.patterns_dir / "60_bpm_pattern_fine.npy"))
-            self.BPM_PATTERN_130 = np.load(str(self.patterns_dir / "130_bpm_pattern.npy"))
-            self.BPM_PATTERN_FINE_130 = np.load(str(self.patterns_dir / "130_bpm_pattern_fine.npy"))
-            self.BPM_PATTERN_210 = np.load(str(self.patterns_dir / "210_bpm_pattern.npy"))
-            self.BPM_PATTERN_FINE_210 = np.load(str(self.patterns_dir / "210_bpm_pattern_fine.npy"))
-        except Exception as e:
-            print("❌ Error loading BPM patterns:", e)
-            traceback.print_exc()
-            print("Closing application...")
-            sys.exit(1)
-                    
+        # With onsets, beat events are the onsets of a decimated envelope,
+        # weighted by strength, instead of the loudest sample of every half
+        # second; see OnsetDetector.
+        self.onset_detector = OnsetDetector(self.frame_rate) if onsets else None
+
+        # The tempo engine; see TempoEstimator.
+        self.estimator = self.make_estimator(engine)
+        self.estimator.set_ranges([(self.start_bpm, self.width)])
+
+        # Only the selected range is mapped; others are opened on demand
+        # by change_bpm_pattern. Engines without patterns never open them.
+        # Analyzers of several sessions can share one read-only store.
+        self.pattern_store = pattern_store or PatternStore(PathUtils.get_patterns_dir(), self.frame_rate, self.width)
+        self.bpm_pattern, self.bpm_pattern_fine = None, None
+        # (start BPM, first row in bpm_pattern, fine pattern) of each searched range
+        self.ranges = [(self.start_bpm, 0, None)]
+        if self.estimator.uses_patterns:
+            started = perf_counter()
+            try:
+                self.bpm_pattern, self.bpm_pattern_fine = self.pattern_store.get(self.start_bpm, range_key=self.range_key)
+                self.ranges = [(self.start_bpm, 0, self.bpm_pattern_fine)]
+            except Exception as e:
+                print("❌ Error loading BPM patterns:", e)
+                traceback.print_exc()
+                print("Closing application...")
+                sys.exit(1)
+            print(f"✅ BPM patterns ready in {(perf_counter() - started) * 1000:.1f} ms "
+                  f"({self.pattern_store.nbytes() / 1024:.1f} KiB mapped)")
+
+        # Incremental mode only analyzes the audio that arrived since the
+        # previous estimate; see IncrementalAnalysis. It needs the pattern
+        # engine.
+        self.window_seconds = window_seconds
+        self.incremental_requested = incremental
+        self.incremental = None
+        if incremental and self.estimator.uses_patterns:
+            self.incremental = IncrementalAnalysis(self, self.bpm_pattern, window_seconds)
+
+    def add_output(self, name: str, set_bpm) -> None:
+        """Publish every averaged BPM with set_bpm(bpm_float), timed as stage name."""
+        self.outputs.append((name, set_bpm))
+
+    def add_phase_output(self, name: str, set_beat) -> None:
+        """Publish the beat phase of every estimate that has one with set_beat(beat_time), timed as stage name.
 
-        self.bpm_pattern = self.BPM_PATTERN_60
-        self.bpm_pattern_fine = self.BPM_PATTERN_FINE_60
+        beat_time is the perf_counter time at which the latest beat of the
+        buffer was captured. Only the pattern engine finds a phase.
+        """
+        self.phase_outputs.append((name, set_beat))
+
+    def add_histogram_output(self, name: str, set_histogram) -> None:
+        """Publish the VoteHistogram of every pattern search, with or without an estimate, timed as stage name.
+
+        Histograms are only computed while there is such an output.
+        """
+        self.histogram_outputs.append((name, set_histogram))
+
+    @property
+    def engine(self) -> str:
+        """Name of the selected tempo engine."""
+        return self.estimator.name
+
+    def make_estimator(self, engine: str):
+        """Tempo estimator for an engine name of TEMPO_ENGINES."""
+        if engine == PATTERN_ENGINE:
+            return PatternEstimator(self)
+        if engine == AUTOCORRELATION_ENGINE:
+            return AutocorrelationEstimator(self.frame_rate, self.onset_detector)
+        raise ValueError(f"Unknown tempo engine: {engine}")
 
     def search_beat_events(self, signal_array: np.ndarray, frame_rate: int) -> np.ndarray:
+        """Position of the loudest sample of every half second, without modifying signal_array.
+
+        A half second without any positive sample gives its first sample
+        that is below its maximum, or its start.
+        """
         step_size = frame_rate // 2
-        events = []
-        for step_start in range(0, len(signal_array), step_size):
-            signal_array_window = signal_array[step_start : step_start + step_size]
-            signal_array_window[signal_array_window < signal_array_window.max()] = 0
-            signal_array_window[signal_array_window > 0] = 1
-            event = np.argmax(signal_array_window) + step_start
-            events.append(event)
-        return np.array(events, dtype=np.int64)
-
-    def bpm_container(self, beat_events: np.ndarray, bpm_pattern: np.ndarray, steps: int) -> list[list]:
-        bpm_container = [list(np.zeros((1,), dtype=np.int64))for _ in range(beat_events.size * steps)]
-        for i, beat_event in enumerate(beat_events):
-            found_in_pattern = np.where(np.logical_and(bpm_pattern >= beat_event - 20, bpm_pattern <= beat_event + 20))
-            for x, q in enumerate(found_in_pattern[0]):
-                bpm_container[i * steps + q].append(found_in_pattern[1][x])
+        full = len(signal_array) // step_size * step_size
+        events = [self._loudest(signal_array[:full].reshape(-1, step_size))]
+        if full < len(signal_array):
+            events.append(self._loudest(signal_array[full:].reshape(1, -1)))
+        return np.concatenate(events) + np.arange(0, len(signal_array), step_size, dtype=np.int64)
+
+    @staticmethod
+    def _loudest(windows: np.ndarray) -> np.ndarray:
+        peaks = windows.max(axis=1)
+        events = windows.argmax(axis=1)
+        for i in np.flatnonzero(peaks <= 0):
+            events[i] = np.argmax(windows[i] != peaks[i]) if peaks[i] < 0 else 0
+        return events
+
+    def detect_beat_events(self, signal_array: np.ndarray) -> tuple:
+        """Beat events of signal_array and their weights (None when unweighted)."""
+        if self.onset_detector:
+            return self.onset_detector.detect(signal_array)
+        return self.search_beat_events(signal_array, self.frame_rate), None
+
+    def bpm_container(self, beat_events: np.ndarray, bpm_pattern: BpmPattern, steps: int, weights: np.ndarray = None) -> np.ndarray:
+        """Votes of the beat events for every (tempo step, offset)."""
+        votes = bpm_pattern.votes(beat_events, tolerance=20, weights=weights)
+        if len(votes) == steps:
+            return votes
+        bpm_container = np.zeros((steps, bpm_pattern.offsets), dtype=votes.dtype)
+        bpm_container[:len(votes)] = votes[:steps]
         return bpm_container
 
-    def wrap_bpm_container(self, bpm_container: list, steps: int) -> list[list]:
-        def flatten(input_list: list) -> list:
-            return [item for sublist in input_list for item in sublist]
-
-        bpm_container_wrapped = [list(np.zeros((1,), dtype=np.int64)) for _ in range(steps)]
-        for i, w in enumerate(bpm_container_wrapped):
-            w.extend(flatten(bpm_container[i::steps]))
-            w.remove(0)
-            bpm_container_wrapped[i] = list(filter(lambda num: num != 0, w))
-        return bpm_container_wrapped
-
-    def finalise_bpm_container(self, bpm_container_wrapped: list, steps: int) -> np.ndarray:
-        bpm_container_final = np.zeros((steps, 1), dtype=np.int64)
-        for i, w in enumerate(bpm_container_wrapped):
-            values, counts = np.unique(w, return_counts=True)
-            values = values[counts == counts.max()]
-            if values[0] > 0:
-                count = np.count_nonzero(w == values[0])
-                bpm_container_final[i] = count
-        return bpm_container_final
+    def finalise_bpm_container(self, bpm_container: np.ndarray, steps: int) -> np.ndarray:
+        """Vote count of the modal offset of every tempo step.
+
+        Offset 0 never counts as a vote. A tempo step without any vote
+        raises ValueError, which makes search_bpm give up.
+        """
+        counts = bpm_container[:, 1:].max(axis=1)
+        if not counts.all():
+            raise ValueError("Tempo step without votes")
+        return counts.reshape(steps, 1)
 
     def get_bpm_wrapped(self, bpm_container_final: np.ndarray) -> np.ndarray:
         return np.where(bpm_container_final == np.amax(bpm_container_final))
@@ -115,88 +194,306 @@ class BpmAnalyzer:
         end = int(start + 40)
         return start, end
 
-    def bpm_wrapped_to_float_str(self, bpm: np.ndarray, bpm_fine: np.ndarray) -> float:
+    def bpm_wrapped_to_float_str(self, bpm: np.ndarray, bpm_fine: np.ndarray, start_bpm: int = None) -> float:
+        start_bpm = self.start_bpm if start_bpm is None else start_bpm
         bpm_float = round(
-            float((((bpm[0][0] / 4) + self.start_bpm - 10) - 1) + (bpm_fine[0][0] * 0.05)), 2
+            float((((bpm[0][0] / 4) + start_bpm - 10) - 1) + (bpm_fine[0][0] * 0.05)), 2
         )
         bpm_str = format(bpm_float, ".2f")
         return bpm_float, bpm_str
 
-    def change_bpm_pattern(self, range_key: str) -> None:
+    def change_bpm_pattern(self, range_key: str, estimator=None) -> None:
+        """Search range_key (a BPM_RANGES key, a custom range like "85–95" or AUTO_RANGE), switching to estimator if given."""
+        estimator = estimator or self.estimator
+        if range_key == AUTO_RANGE:
+            selected = list(BPM_RANGES.values())
+        elif range_bounds(range_key):
+            selected = [range_bounds(range_key)]
+        else:
+            return
+        starts = [start_bpm for start_bpm, _ in selected]
+        keys = list(BPM_RANGES) if range_key == AUTO_RANGE else [range_key]
+        # The tables of the predefined ranges all span self.width BPM, custom
+        # ranges get tables of their own width
+        widths = [None if range_key == AUTO_RANGE or range_key in BPM_RANGES else width for _, width in selected]
+        first_steps = [int((start_bpm - starts[0]) / COARSE_STEP_BPM) for start_bpm in starts]
+        patterns = [(None, None)] * len(starts)
+        bpm_pattern = None
+        if estimator.uses_patterns:
+            # Mapping a range only costs page faults, but keep it outside the
+            # analyzer lock in case the files have to be generated.
+            patterns = [self.pattern_store.get(start_bpm, width, key)
+                        for start_bpm, width, key in zip(starts, widths, keys)]
+            # Overlapping ranges share tempo steps, so in auto mode the coarse
+            # patterns are stacked into one covering every range once.
+            if len(patterns) == 1:
+                bpm_pattern = patterns[0][0]
+            else:
+                bpm_pattern = BpmPattern.stack([coarse for coarse, _ in patterns], first_steps)
         with self.lock:
-            if range_key == "60–160":
-                self.bpm_pattern = self.BPM_PATTERN_60
-                self.bpm_pattern_fine = self.BPM_PATTERN_FINE_60
-                self.start_bpm = 60
-            elif range_key == "130–230":
-                self.bpm_pattern = self.BPM_PATTERN_130
-                self.bpm_pattern_fine = self.BPM_PATTERN_FINE_130
-                self.start_bpm = 130
-            elif range_key == "210–300":
-                self.bpm_pattern = self.BPM_PATTERN_210
-                self.bpm_pattern_fine = self.BPM_PATTERN_FINE_210
-                self.start_bpm = 210
+            self.range_key = range_key
+            self.bpm_pattern = bpm_pattern
+            self.bpm_pattern_fine = patterns[0][1]
+            if bpm_pattern is not None:
+                # Coarse steps of each range; auto mode ranges have the same width
+                self.coarse_steps = len(patterns[0][0])
+            self.start_bpm = starts[0]
+            self.ranges = [(start_bpm, first_step, fine) for start_bpm, first_step, (_, fine)
+                           in zip(starts, first_steps, patterns)]
+            estimator.set_ranges(selected)
+            self.estimator = estimator
+            if not estimator.uses_patterns:
+                self.incremental = None
+            elif self.incremental:
+                self.incremental.set_pattern(bpm_pattern)
+            elif self.incremental_requested:
+                self.incremental = IncrementalAnalysis(self, bpm_pattern, self.window_seconds)
+
+    def change_engine(self, engine: str) -> None:
+        """Switch tempo engine, mapping the patterns of the current range if it needs them."""
+        self.change_bpm_pattern(self.range_key or AUTO_RANGE, self.make_estimator(engine))
 
 
     def search_bpm(self, signal_array: np.ndarray) -> tuple:
-        bpm_pattern = self.bpm_pattern
-        bpm_pattern_fine = self.bpm_pattern_fine
-        beat_events = self.search_beat_events(signal_array, self.frame_rate)
-        for switch_pattern in [self.coarse_steps, 40]:
-            bpm_container = self.bpm_container(
-                beat_events, bpm_pattern, switch_pattern
-            )
-            bpm_container_wrapped = self.wrap_bpm_container(
-                bpm_container, switch_pattern
-            )
+        """Tempo of a filtered buffer with the selected engine: (bpm_float, bpm_str), or 0."""
+        self.last_beat = None
+        self.last_histogram = None
+        return self.estimator.estimate(signal_array)
+
+    def search_bpm_curve(self, signal_array: np.ndarray, window_seconds: float = None, hop_seconds: float = 1.0) -> tuple:
+        """Tempo over time of a long filtered signal: (time, bpm, confidence) arrays, one per window.
+
+        Windows of window_seconds (the analyzer's by default, or the whole
+        signal if shorter) start every hop_seconds, which must be a whole
+        number of half seconds so that overlapping windows share their beat
+        events (ValueError otherwise); time is the middle of each window.
+        bpm is 0 where search_bpm gives no tempo. confidence is the share of
+        the window's beat events the tempo explains (NaN for engines without
+        one).
+
+        The pattern engine is about 2x faster than search_bpm window after
+        window (1.4x with onsets, detected per window); other engines gain
+        little (1.1x for autocorrelation). See benchmarks/curve.py.
+        """
+        window = min(int((window_seconds or self.window_seconds) * self.frame_rate), len(signal_array))
+        halves = hop_seconds * 2
+        if halves < 1 or abs(halves - round(halves)) > 1e-9:
+            raise ValueError(f"The hop must be a whole number of half seconds, not {hop_seconds:g} s")
+        hop = round(halves) * (self.frame_rate // 2)
+        starts = np.arange(0, len(signal_array) - window + 1, hop, dtype=np.int64)
+        bpm, confidence = self.estimator.estimate_curve(signal_array, starts, window)
+        return (starts + window / 2) / self.frame_rate, bpm, confidence
+
+    def search_bpm_patterns(self, signal_array: np.ndarray) -> tuple:
+        """The pattern engine: beat events voting over the pattern tables."""
+        with self.instrumentation.stage("beat_events"):
+            beat_events, weights = self.detect_beat_events(signal_array)
+        return self.search_bpm_votes(
+            lambda bpm_pattern, steps: self.bpm_container(beat_events, bpm_pattern, steps, weights),
+            beat_events,
+            weights,
+        )
+
+    def search_bpm_incremental(self, samples: np.ndarray) -> tuple:
+        """search_bpm for the filtered samples captured since the previous call."""
+        self.last_beat = None
+        self.last_histogram = None
+        with self.instrumentation.stage("beat_events"):
+            self.incremental.update(samples)
+        return self.search_bpm_votes(self.incremental.bpm_container, self.incremental.beat_events(),
+                                     self.incremental.weights())
+
+    def search_bpm_votes(self, votes, beat_events: np.ndarray, weights: np.ndarray = None) -> tuple:
+        """Coarse then fine tempo search over the containers given by votes(pattern, steps).
+
+        The coarse votes are counted once for bpm_pattern, which in auto
+        mode covers every range. Each range is then judged on its own rows
+        like a single range search, and the range whose unambiguous peak
+        best explains the beat events (see vote_strength) is refined.
+        The offset and period of the winning fine step are kept in last_beat.
+        """
+        coarse_steps = self.ranges[-1][1] + self.coarse_steps
+        with self.instrumentation.stage("coarse"):
+            bpm_container = votes(self.bpm_pattern, coarse_steps)
+        if self.histogram_outputs:
+            with self.instrumentation.stage("histogram"):
+                self.last_histogram = self.vote_histogram(bpm_container)
+        candidates = []
+        for start_bpm, first_step, bpm_pattern_fine in self.ranges:
             try:
                 bpm_container_final = self.finalise_bpm_container(
-                    bpm_container_wrapped, switch_pattern
+                    bpm_container[first_step:first_step + self.coarse_steps], self.coarse_steps
                 )
             except ValueError:
-                return 0
+                continue
             bpm_wrapped = self.get_bpm_wrapped(bpm_container_final)
             if not self.check_bpm_wrapped(bpm_wrapped, bpm_container_final):
-                return 0
-            if switch_pattern == self.coarse_steps:
-                start, end = self.get_bpm_pattern_fine_window(bpm_wrapped)
-                bpm_pattern = bpm_pattern_fine[start:end]
-                bpm_wrapped_full_range = bpm_wrapped
-            else:
-                bpm_wrapped_fine_range = bpm_wrapped
-                return self.bpm_wrapped_to_float_str(
-                    bpm_wrapped_full_range, bpm_wrapped_fine_range
-                )
+                continue
+            step = first_step + int(bpm_wrapped[0][0])
+            offset = int(np.argmax(bpm_container[step, 1:])) + 1
+            candidates.append((int(self.bpm_pattern.periods[step]), offset, start_bpm, bpm_pattern_fine, bpm_wrapped))
+        if not candidates:
+            return 0
+        if len(candidates) > 1:
+            candidates = self.slowest_explaining(candidates, beat_events, weights)
+        _, _, start_bpm, bpm_pattern_fine, bpm_wrapped_full_range = candidates[0]
+
+        start, end = self.get_bpm_pattern_fine_window(bpm_wrapped_full_range)
+        with self.instrumentation.stage("fine"):
+            bpm_container = votes(bpm_pattern_fine[start:end], 40)
+        try:
+            bpm_container_final = self.finalise_bpm_container(bpm_container, 40)
+        except ValueError:
+            return 0
+        bpm_wrapped_fine_range = self.get_bpm_wrapped(bpm_container_final)
+        if not self.check_bpm_wrapped(bpm_wrapped_fine_range, bpm_container_final):
+            return 0
+        step = int(bpm_wrapped_fine_range[0][0])
+        offset = int(np.argmax(bpm_container[step, 1:])) + 1
+        self.last_beat = (bpm_pattern_fine.jump * (offset + 1), int(bpm_pattern_fine.periods[start + step]))
+        return self.bpm_wrapped_to_float_str(
+            bpm_wrapped_full_range, bpm_wrapped_fine_range, start_bpm
+        )
+
+    def vote_histogram(self, bpm_container: np.ndarray) -> VoteHistogram:
+        """Coarse votes of every tempo step, max-pooled into bars of HISTOGRAM_BPM."""
+        counts = bpm_container[:, 1:].max(axis=1)
+        factor = max(int(HISTOGRAM_BPM / COARSE_STEP_BPM), 1)
+        bars = len(counts) // factor
+        votes = counts[:bars * factor].reshape(bars, factor).max(axis=1).astype(np.float32)
+        # Coarse step i is the tempo start_bpm - 10 + COARSE_STEP_BPM * (i + 1)
+        return VoteHistogram(self.ranges[0][0] - 10 + COARSE_STEP_BPM, factor * COARSE_STEP_BPM, votes)
+
+    def slowest_explaining(self, candidates: list, beat_events: np.ndarray, weights: np.ndarray = None) -> list:
+        """Sort the range winners of auto mode, the one to refine first.
+
+        candidates are (period, offset, ...) of each range's winning step.
+        The 32 pattern beats only reach part of the buffer at fast tempos,
+        so each winner is judged on the beat events it explains within the
+        span every winner reaches. A multiple of the tempo explains at least
+        the same events, so the slowest winner explaining nearly as many as
+        the best is kept (the lowest range on a tie).
+        """
+        jump = self.bpm_pattern.jump
+        beats = self.bpm_pattern.beats
+        last = min(jump * (offset + 1) + (beats - 1) * period for period, offset, *_ in candidates)
+        reached = beat_events <= last
+        events = beat_events[reached]
+        weights = np.ones(len(events)) if weights is None else weights[reached]
+        explained = []
+        for period, offset, *_ in candidates:
+            beat = np.round((events - jump * (offset + 1)) / period)
+            distance = np.abs(events - jump * (offset + 1) - beat * period)
+            explained.append(weights[(distance <= 20) & (beat >= 0) & (beat < beats)].sum())
+        kept = [c for c, count in zip(candidates, explained) if count >= max(explained) * AUTO_MARGIN]
+        return sorted(kept, key=lambda candidate: -candidate[0])
+
+    def new_samples(self, buffer: np.ndarray, position: int) -> np.ndarray:
+        """Part of buffer (ending at stream position) not seen by the incremental analysis yet."""
+        new = position - self.incremental.position
+        if new < 0 or new > len(buffer):
+            # Analysis fell behind the buffer: start over from what is left
+            self.incremental.reset(position - len(buffer))
+            new = len(buffer)
+        return buffer[len(buffer) - new:]
+
+    def analyze_step(self) -> tuple:
+        """Analyze the latest audio once and publish the averaged BPM to the outputs.
+
+        Waits up to a second for new audio. Returns the estimate of this
+        buffer, (bpm_float, bpm_str), or 0.
+        """
+        stats = self.instrumentation
+        with stats.stage("iteration"):
+            incremental = self.incremental
+            with stats.stage("get_buffer"):
+                if incremental:
+                    buffer, position = self.module.audio_streamer.get_buffer_and_position(incremental.position, filtered=True)
+                else:
+                    buffer = self.module.audio_streamer.get_buffer(filtered=True)
+            with self.lock:
+                if incremental is not self.incremental:
+                    # The engine changed while waiting for audio
+                    return 0
+                with stats.stage("analysis"):
+                    if incremental:
+                        bpm_float_str = self.search_bpm_incremental(self.new_samples(buffer, position))
+                    else:
+                        bpm_float_str = self.search_bpm(buffer)
+                self.beat_phase = None
+                if bpm_float_str and self.last_beat:
+                    # The buffer (from the oldest window in incremental mode) ends at buffer_time
+                    span = incremental.position - incremental.anchor() if incremental else len(buffer)
+                    self.beat_phase = self.phase_at(self.last_beat, span)
+                if bpm_float_str:
+                    self.module.bpm_storage.average_window.append(bpm_float_str[0]) 
+                    bpm_average = round(
+                        (
+                            sum(self.module.bpm_storage.average_window)
+                            / len(self.module.bpm_storage.average_window)
+                        ),
+                        2,
+                    )
+                    (
+                        self.module.bpm_storage._float,
+                        self.module.bpm_storage._str,
+                    ) = bpm_average, format(bpm_average, ".2f")
+                
+                    print(f"{self.label}Detected BPM:", self.module.bpm_storage._str)
+                    for name, set_bpm in self.outputs:
+                        with stats.stage(name):
+                            set_bpm(self.module.bpm_storage._float)
+                    if self.beat_phase:
+                        for name, set_beat in self.phase_outputs:
+                            with stats.stage(name):
+                                set_beat(self.beat_phase.time)
+                    self.check_latency()
+                else:
+                    stats.count("no_estimate")
+                if self.last_histogram is not None:
+                    for name, set_histogram in self.histogram_outputs:
+                        with stats.stage(name):
+                            set_histogram(self.last_histogram)
+        return bpm_float_str
+
+    def phase_at(self, last_beat: tuple, span: int) -> BeatPhase:
+        """BeatPhase of a (offset, period) found in a buffer of span samples ending at the last read.
+
+        The latest beat is extrapolated from the first along the fine
+        period, whose rounding costs less than a sample a beat, and dated
+        from the time the newest samples arrived, less the input latency
+        of the source.
+        """
+        offset, period = last_beat
+        latest = offset + (span - offset) // period * period
+        streamer = self.module.audio_streamer
+        time = streamer.buffer_time - streamer.latency - (span - latest) / self.frame_rate
+        return BeatPhase(offset, period, time)
+
+    def check_latency(self) -> None:
+        """Record how long after capture the BPM reached the outputs, and flag it when late."""
+        stats = self.instrumentation
+        if not (stats.enabled or self.target_latency):
+            return
+        latency = perf_counter() - self.module.audio_streamer.buffer_time
+        stats.record("capture_to_output", latency)
+        if self.target_latency and latency > self.target_latency:
+            stats.count("over_target_latency")
+            if not self.late_warned:
+                self.late_warned = True
+                print(f"⚠️  {self.label}BPM published {latency:.2f} s after capture, "
+                      f"over the {self.target_latency:.2f} s target")
 
     def run_analyzer(self) -> None:
         """Main analyzer loop with error handling."""
         try:
             while not self.stop_analyzer.is_set():
                 try:
-                    buffer = self.module.audio_streamer.get_buffer()
-                    buffer = self.bandpass_filter(buffer)
-                    with self.lock:
-                        if bpm_float_str := self.search_bpm(buffer):
-                            self.module.bpm_storage.average_window.append(bpm_float_str[0]) 
-                            bpm_average = round(
-                                (
-                                    sum(self.module.bpm_storage.average_window)
-                                    / len(self.module.bpm_storage.average_window)
-                                ),
-                                2,
-                            )
-                            (
-                                self.module.bpm_storage._float,
-                                self.module.bpm_storage._str,
-                            ) = bpm_average, format(bpm_average, ".2f")
-                            
-                            print("Detected BPM:", self.module.bpm_storage._str)
-                            self.module.ui.set_bpm(self.module.bpm_storage._float)
-                            self.module.ableton_link.set_bpm(self.module.bpm_storage._float)
-                            
+                    self.analyze_step()
                 except Exception as e:
                     print(f"❌ Error in analysis loop: {e}")
                     traceback.print_exc()
+                    self.error = str(e)
                     break
         except Exception as e:
             print(f"❌ Critical error in run_analyzer: {e}")
@@ -209,6 +506,7 @@ class BpmAnalyzer:
         """Start analyzer thread with error handling."""
         try:
             self.stop_analyzer.clear()
+            self.error = None
             self.module.audio_streamer.start_stream(input_device_index=input_device_index)
             self.module.ableton_link.enable(True)
             Thread(target=self.run_analyzer, daemon=True).start()
@@ -230,24 +528,9 @@ class BpmAnalyzer:
             print(f"❌ Error stopping analyzer: {e}")
             traceback.print_exc()
 
-    def butter_bandpass(self, lowcut, highcut, fs, order=10):
-        """Calculate butterworth bandpass filter coefficients."""
-        nyq = 0.5 * fs
-        low = lowcut / nyq
-        high = highcut / nyq
-        b, a = signal.butter(order, [low, high], btype='band')
-        return b, a
-
-    def butter_bandpass_filter(self, data, lowcut, highcut, fs, order=10):
-        """Apply butterworth bandpass filter to data."""
-        b, a = self.butter_bandpass(lowcut, highcut, fs, order=order)
-        y = signal.lfilter(b, a, data)
-        return y
-
     def bandpass_filter(self, audio_signal, lowcut=60.0, highcut=3000.0) -> np.ndarray:
-        """Apply bandpass filter along each axis."""
-        return np.apply_along_axis(
-            lambda buffer: self.butter_bandpass_filter(buffer, lowcut, highcut, self.frame_rate, order=6), 
-            0, 
-            audio_signal
-        ).astype('int16')
+        """Apply the band-pass filter to a whole buffer.
+
+        The live loop reads audio already filtered by AudioStreamer.
+        """
+        return BandpassFilter.bandpass_filter(audio_signal, self.frame_rate, lowcut, highcut)
@@ -0,0 +1,180 @@
+import numpy as np
+
+
+BEATS = 32
+JUMP = 20
+
+
+class BpmPattern:
+    """Arithmetic view of a BPM pattern table.
+
+    A pattern stands for the table holding, for every tempo step, offset
+    and beat number, the sample position
+
+        pattern[step, offset, beat] = beat * period[step] + JUMP * (offset + 1)
+
+    Only the per-step beat period is stored (see PatternStore); positions
+    are computed when they are needed.
+    """
+    def __init__(self, periods: np.ndarray, offsets: int, beats: int = BEATS, jump: int = JUMP):
+        self.periods = periods
+        self.offsets = offsets
+        self.beats = beats
+        self.jump = jump
+
+    @classmethod
+    def coarse(cls, frame_rate: int, start_bpm: int, width: int = 100, step: float = 0.25) -> "BpmPattern":
+        """Pattern of the coarse search: steps of step BPM (0.25 by default) from start_bpm - 10 + step."""
+        sample = int((width + 10) / step)
+        # Tempo of step i is start_bpm - 10 + step * (i + 1)
+        add = np.cumsum(np.full(sample, step))
+        return cls(beat_periods(frame_rate, start_bpm, add), offsets_for(frame_rate))
+
+    @classmethod
+    def fine(cls, frame_rate: int, start_bpm: int, width: int = 100, step: float = 0.05) -> "BpmPattern":
+        """Pattern of the fine search: steps of step BPM (0.05 by default) from start_bpm - 10."""
+        sample = int((width + 10) / step)
+        # Tempo of step i is start_bpm - 10 + step * i, accumulated like the
+        # original loop (cumsum adds sequentially, so rounding is identical)
+        add = np.concatenate(([0.0], np.cumsum(np.full(sample - 1, step))))
+        return cls(beat_periods(frame_rate, start_bpm, add), offsets_for(frame_rate))
+
+    @classmethod
+    def stack(cls, patterns: list, first_steps: list) -> "BpmPattern":
+        """One pattern over several, each starting at its step in first_steps.
+
+        Patterns may overlap (the BPM ranges share the 0.25 BPM grid);
+        overlapping steps must have the same period.
+        """
+        periods = np.zeros(max(f + len(p) for p, f in zip(patterns, first_steps)), dtype=np.int64)
+        filled = np.zeros(len(periods), dtype=bool)
+        for pattern, first in zip(patterns, first_steps):
+            rows = slice(first, first + len(pattern))
+            if np.any(filled[rows] & (periods[rows] != pattern.periods)):
+                raise ValueError("Overlapping patterns disagree")
+            periods[rows] = pattern.periods
+            filled[rows] = True
+        return cls(periods, patterns[0].offsets, patterns[0].beats, patterns[0].jump)
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def __getitem__(self, index: slice) -> "BpmPattern":
+        """Slice tempo steps, with the same semantics as slicing the table."""
+        if not isinstance(index, slice):
+            raise TypeError("BpmPattern only supports slicing tempo steps")
+        return BpmPattern(self.periods[index], self.offsets, self.beats, self.jump)
+
+    def positions(self, step, offset, beat) -> np.ndarray:
+        """Sample position(s) for (step, offset, beat); arguments broadcast."""
+        period = np.asarray(self.periods, dtype=np.int64)[step]
+        return np.asarray(beat, dtype=np.int64) * period + self.jump * (np.asarray(offset, dtype=np.int64) + 1)
+
+    def votes(self, beat_events: np.ndarray, tolerance: int = 20, beats: range = None,
+              weights: np.ndarray = None) -> np.ndarray:
+        """Count, for every (step, offset), the beat events within +-tolerance of it.
+
+        beats defaults to the beat numbers of the table, range(32). With
+        weights, each event counts for its weight instead of 1.
+
+        For each event, step and beat number the matching offsets are a
+        contiguous run of the offset column jump * (1 .. offsets), whose
+        bounds are found by integer division. Only the one to three beat
+        numbers that can land an event within the offset span are tried.
+        Runs are accumulated as +1/-1 boundaries with bincount and summed
+        along the offsets. Periods are much larger than the tolerance, so an
+        event matches a given (step, offset) through at most one beat number.
+        """
+        if beats is None:
+            beats = range(self.beats)
+        periods = np.asarray(self.periods, dtype=np.int64)
+        steps = len(periods)
+        if not steps:
+            return np.zeros((0, self.offsets), dtype=np.int64)
+        events = np.asarray(beat_events, dtype=np.int64)
+        # beat * period must fall in [event - span, event + tolerance - jump]
+        span = self.jump * self.offsets + tolerance
+        # Beat numbers to try per step; steps needing as many are done together
+        candidates = (span + tolerance) // periods + 1
+        lo_index, hi_index, event_weights = [], [], []
+        for group in np.split(np.arange(steps), np.flatnonzero(np.diff(candidates)) + 1):
+            group_periods = periods[group]
+            first = np.maximum(-((span - events[:, None]) // group_periods[None, :]), beats.start)
+            beat = first[:, :, None] + np.arange(candidates[group].max(), dtype=np.int64)
+            base = events[:, None, None] - group_periods[None, :, None] * beat
+            # Same as searchsorted(column, base -+ tolerance, side="left"/"right")
+            lo = np.clip(-((tolerance - base) // self.jump) - 1, 0, self.offsets)
+            hi = np.clip((base + tolerance) // self.jump, 0, self.offsets)
+            hi = np.where(beat < beats.stop, hi, lo)
+            rows = group[None, :, None] * (self.offsets + 1)
+            lo_index.append((rows + lo).ravel())
+            hi_index.append((rows + hi).ravel())
+            if weights is not None:
+                event_weights.append(np.broadcast_to(np.asarray(weights)[:, None, None], lo.shape).ravel())
+        size = steps * (self.offsets + 1)
+        event_weights = np.concatenate(event_weights) if weights is not None else None
+        bounds = (np.bincount(np.concatenate(lo_index), event_weights, minlength=size)
+                  - np.bincount(np.concatenate(hi_index), event_weights, minlength=size))
+        return np.cumsum(bounds.reshape(steps, self.offsets + 1), axis=1)[:, :-1]
+
+    def window_votes(self, beat_events: np.ndarray, windows: np.ndarray, count: int, first_steps: np.ndarray = None,
+                     steps: int = None, tolerance: int = 20, weights: np.ndarray = None) -> np.ndarray:
+        """votes() of count buffers at once, as a (count, steps, offsets) array.
+
+        windows gives the buffer (0 to count - 1) of every beat event, whose
+        positions are relative to the start of its buffer. Buffer w votes for
+        the steps first_steps[w] to first_steps[w] + steps, every step of the
+        table by default.
+
+        The beat numbers and offset runs are found like in votes(), but in
+        floating point, whose vector division is much faster than integer
+        floor division. float32 is exact while every numerator stays below
+        2**24 (the quotient then never rounds across an integer), which
+        holds for buffers of up to 25 minutes at 11025 Hz; float64 is used
+        beyond. A run spans at most 2 * tolerance / jump + 1 offsets, so
+        every offset it covers is counted directly by one bincount, with no
+        +1/-1 boundaries to sum along the offsets.
+        """
+        periods = np.asarray(self.periods, dtype=np.int64)
+        if first_steps is None:
+            first_steps, steps = np.zeros(count, dtype=np.int64), len(periods)
+        shape = (count, steps, self.offsets)
+        windows = np.asarray(windows, dtype=np.int64)
+        if not len(windows) or not steps:
+            return np.zeros(shape, dtype=np.int64 if weights is None else np.float64)
+        step = np.asarray(first_steps, dtype=np.int64)[windows][:, None] + np.arange(steps)
+        step_periods = periods[step]
+        candidates = (self.jump * self.offsets + 2 * tolerance) // int(step_periods.min()) + 1
+        # beat * period must fall in [event - span, event + tolerance - jump]
+        span = self.jump * self.offsets + tolerance
+        events = np.asarray(beat_events, dtype=np.int64)
+        largest = int(np.abs(events).max()) + 2 * span + int(step_periods.max())
+        dtype = np.float32 if largest < 2 ** 24 else np.float64
+        step_periods = step_periods.astype(dtype)
+        events = events.astype(dtype)[:, None]
+        first = np.maximum(-np.floor((span - events) / step_periods), 0)
+        rows = (windows[:, None] * steps + np.arange(steps)) * self.offsets
+        if weights is not None:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, None], rows.shape)
+        index, hit_weights = [], []
+        for candidate in range(candidates):
+            beat = first + candidate
+            base = events - step_periods * beat
+            lo = np.maximum(-np.floor((tolerance - base) / self.jump) - 1, 0)
+            hi = np.where(beat < self.beats, np.minimum(np.floor((base + tolerance) / self.jump), self.offsets), lo)
+            for i in range(2 * tolerance // self.jump + 1):
+                hit = lo + i < hi
+                index.append(rows[hit] + (lo[hit] + i).astype(np.int64))
+                if weights is not None:
+                    hit_weights.append(weights[hit])
+        return np.bincount(np.concatenate(index), np.concatenate(hit_weights) if weights is not None else None,
+                           minlength=count * steps * self.offsets).reshape(shape)
+
+def beat_periods(frame_rate: int, start_bpm: int, add: np.ndarray) -> np.ndarray:
+    """Samples between two beats, int(60 / bpm * frame_rate), for every tempo step."""
+    return (60 / (start_bpm - 10 + add) * frame_rate).astype(np.int64)
+
+
+def offsets_for(frame_rate: int) -> int:
+    """Number of 20-sample offsets spanning half a second."""
+    return int((frame_rate / 2) / JUMP)
@@ -0,0 +1,9 @@
+from collections import deque
+
+
+class BpmStorage:
+    """Storage for BPM values."""
+    def __init__(self):
+        self._float = 120.00  # default
+        self._str = "***.**"  # default
+        self.average_window = deque(maxlen=3)
@@ -0,0 +1,118 @@
+import numpy as np
+import threading
+import traceback
+from time import perf_counter
+from RingBuffer import RingBuffer
+from Instrumentation import DISABLED
+from BandpassFilter import StreamingBandpass
+
+
+class CaptureSource:
+    """Capture rings, band-pass and analyzer wake-up, for any source of int16 audio blocks.
+
+    A source (AudioStreamer, Recording.ReplayStreamer) calls write_block()
+    with every block as it arrives; the analyzer reads the rings with
+    get_buffer_and_position(). Nothing here needs PyAudio.
+    """
+    def __init__(self, frame_rate: int = 11025, operating_range_seconds: float = 12, instrumentation=DISABLED,
+                 chunk: int = 10240, hop_seconds: float = None, shared: bool = False):
+        self.frame_rate = frame_rate
+        self.instrumentation = instrumentation
+        self.chunk = chunk
+        # The analyzer is woken once a hop of new audio arrived since it
+        # last read. Hops it had no time for are coalesced: it reads the
+        # latest buffer once instead of catching up.
+        self.hop = int(hop_seconds * frame_rate) if hop_seconds else chunk
+        self.read_position = 0
+        self.written_time = 0.0
+        self.buffer_time = 0.0  # When the newest samples of the last read arrived
+        self.latency = 0.0  # Seconds from the input to the callback, when the source knows it
+        # Written by the source only, read by the analyzer only. Audio is
+        # band-pass filtered as it arrives, into filtered_buffer; the raw
+        # blocks are only kept by a recorder (start_recording).
+        ring = RingBuffer.shared if shared else RingBuffer
+        self.filtered_buffer = ring(int(frame_rate * operating_range_seconds), headroom=self.chunk)
+        self.bandpass = StreamingBandpass(frame_rate)
+        self.operating_range_seconds = operating_range_seconds
+        self.buffer_updated = threading.Event()
+        # Set by every read, for sources that wait for the analyzer
+        self.buffer_read = threading.Event()
+        # Recording.CaptureRecorder receiving every raw block, if any
+        self.recorder = None
+
+    def write_block(self, samples: np.ndarray, overflow: bool = False) -> None:
+        """Filter and store a block of raw samples, waking the analyzer once a hop arrived."""
+        stats = self.instrumentation
+        with stats.stage("callback") as callback:
+            with stats.stage("bandpass"):
+                filtered = self.bandpass.process(samples)
+            self.filtered_buffer.write(filtered)
+            self.written_time = perf_counter()
+            if self.filtered_buffer.position - self.read_position >= self.hop:
+                self.buffer_updated.set()
+            if self.recorder is not None:
+                self.recorder.write(samples, overflow)
+        # The callback has one chunk of audio time before the next one is due
+        if callback.last > len(samples) / self.frame_rate:
+            stats.count("callback_overrun")
+        if overflow:
+            stats.count("input_overflow")
+
+    def reset(self) -> None:
+        """Start a new stream: fresh filter state, and wait for a hop of it."""
+        self.bandpass.reset()
+        self.read_position = self.filtered_buffer.position
+
+    def start_recording(self, path: str) -> None:
+        """Append every raw block from now on to a capture file (see Recording)."""
+        from Recording import CaptureRecorder
+        self.stop_recording()
+        self.recorder = CaptureRecorder(path, self.frame_rate)
+
+    def stop_recording(self) -> None:
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def get_buffer(self, filtered: bool = True) -> np.ndarray:
+        """Get audio buffer with error handling."""
+        return self.get_buffer_and_position(filtered=filtered)[0]
+
+    def get_buffer_and_position(self, since: int = None, filtered: bool = True) -> tuple:
+        """Get the band-passed audio buffer and the stream position (samples captured) at its end.
+
+        With since, only the samples captured after that position are
+        returned (at most a full buffer). Only the filtered audio is kept:
+        filtered=False raises ValueError (record the raw capture instead).
+        """
+        if not filtered:
+            raise ValueError("The raw capture is not buffered; use start_recording to keep it")
+        try:
+            # Wait for data with short timeout to allow fast shutdown
+            self.buffer_updated.wait(timeout=1.0)
+            self.buffer_updated.clear()
+            stats = self.instrumentation
+            if stats.enabled:
+                # How long the newest samples waited before the analyzer read them
+                written = stats.stage("callback").last_time
+                if written:
+                    stats.record("buffer_age", perf_counter() - written)
+            # Read before the samples, so it is never later than their arrival
+            buffer_time = self.written_time
+            buffer, position = self.filtered_buffer.latest(since=since)
+            missed = (position - self.read_position) // self.hop - 1
+            if missed > 0:
+                stats.count("coalesced_hops", missed)
+            self.read_position = position
+            self.buffer_time = buffer_time
+            self.buffer_read.set()
+            return buffer, position
+        except Exception as e:
+            print(f"❌ Error retrieving buffer: {e}")
+            traceback.print_exc()
+            raise
+
+    def close(self) -> None:
+        """Stop recording and release the shared memory of the filtered ring, if any."""
+        self.stop_recording()
+        self.filtered_buffer.close(unlink=True)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Headless BPM analyzer: capture, analysis and Ableton Link without a GUI
+
+Runs the same capture and analysis as App.py but never imports tkinter.
+Every detected BPM is written as a JSON line to stdout or to the clients of
+a local (Unix domain) socket. SIGTERM and SIGINT stop the analysis and
+close the audio stream and socket cleanly.
+
+Usage:
+    python3 Daemon.py --list-devices
+    python3 Daemon.py --device 2
+    python3 Daemon.py --device 2 --range auto --socket /run/bpm.sock --no-link
+    python3 Daemon.py --device 2 --block 512 --hop 0.25 --window 8 --target-latency 0.5
+    python3 Daemon.py --device 2 --channels 0    # Mix every input channel of the interface
+    python3 Daemon.py --device 2 --record show.bpmcap
+    python3 Daemon.py --replay show.bpmcap --no-link    # Exits at the end of the recording
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import argparse
+import contextlib
+import threading
+import traceback
+from time import time
+
+from BpmAnalizer import BpmAnalyzer, BPM_RANGES, TEMPO_ENGINES
+from AnalysisOptions import parse_range
+from BpmStorage import BpmStorage
+from Instrumentation import Instrumentation, DISABLED
+from Sessions import NoLink
+from AnalysisProcess import ProcessAnalyzer
+
+FRAME_RATE = 11025
+
+
+class StreamOutput:
+    """Write every BPM as a JSON line to a text stream (stdout by default)."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def set_bpm(self, value=None) -> None:
+        self.stream.write(json.dumps({"time": round(time(), 3), "bpm": value}) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class SocketOutput:
+    """Broadcast every BPM as a JSON line to the clients of a Unix domain socket.
+
+    Clients connect at any time and only receive what is published after;
+    clients that disconnect or stop reading are dropped.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.clients = []
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+        print(f"✅ Publishing BPM on {path}")
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return  # Server closed
+            # A client that stops reading must not block the analysis
+            client.settimeout(0.1)
+            with self.lock:
+                self.clients.append(client)
+
+    def set_bpm(self, value=None) -> None:
+        line = (json.dumps({"time": round(time(), 3), "bpm": value}) + "\n").encode()
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.sendall(line)
+                except OSError:
+                    client.close()
+                    self.clients.remove(client)
+
+    def close(self) -> None:
+        self.server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class HeadlessModules:
+    """Capture, analysis and Link wired like InitialiseModules, without the UI."""
+    def __init__(self, args, results=None):
+        self.bpm_storage = BpmStorage()
+
+        self.instrumentation = Instrumentation() if args.instrumentation_dump else DISABLED
+        if args.instrumentation_dump:
+            self.instrumentation.start_dump(args.instrumentation_dump)
+
+        if args.replay:
+            from Recording import ReplayStreamer
+            self.audio_streamer = ReplayStreamer(args.replay, args.window, self.instrumentation, args.hop,
+                                                 shared=args.process, realtime=args.realtime)
+        else:
+            # PyAudio is only needed for live capture
+            from AudioStreamer import AudioStreamer
+            self.audio_streamer = AudioStreamer(FRAME_RATE, args.window, self.instrumentation, args.block,
+                                                args.hop, shared=args.process, native=not args.no_native,
+                                                max_channels=args.channels or None)
+        if args.record:
+            self.audio_streamer.start_recording(args.record)
+
+        if args.no_link:
+            self.ableton_link = NoLink()
+        else:
+            from AbletonLink import AbletonLink
+            self.ableton_link = AbletonLink(args.link_threshold, args.link_interval, self.instrumentation,
+                                            args.phase_threshold)
+
+        analyzer = ProcessAnalyzer if args.process else BpmAnalyzer
+        self.bpm_analyzer = analyzer(self, frame_rate=self.audio_streamer.frame_rate, incremental=args.incremental,
+                                     instrumentation=self.instrumentation, onsets=args.onsets,
+                                     engine=args.engine, window_seconds=args.window,
+                                     target_latency=args.target_latency)
+        self.bpm_analyzer.change_bpm_pattern(args.range)
+
+        self.output = SocketOutput(args.socket) if args.socket else StreamOutput(results)
+        self.bpm_analyzer.add_output("output", self.output.set_bpm)
+        if not args.no_link:
+            self.bpm_analyzer.add_output("link", self.ableton_link.set_bpm)
+            if not args.no_link_phase:
+                self.bpm_analyzer.add_phase_output("link_phase", self.ableton_link.set_beat)
+
+    def close(self) -> None:
+        """Stop the analysis and release the stream, socket, Link and shared ring, each even if another fails."""
+        steps = [self.bpm_analyzer.stop_run_analyzer_thread, self.output.close, self.ableton_link.close]
+        if isinstance(self.bpm_analyzer, ProcessAnalyzer):
+            steps.append(self.bpm_analyzer.close)
+        steps.append(self.audio_streamer.close)
+        if self.instrumentation.enabled:
+            steps.append(self.instrumentation.stop_dump)
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                print(f"❌ Error closing: {e}")
+                traceback.print_exc()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless BPM analyzer publishing JSON lines and Ableton Link",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--device", type=int, help="Input device index (default: first input device)")
+    parser.add_argument("--list-devices", action="store_true", help="List input devices and exit")
+    parser.add_argument("--range", default="60–160",
+                        help="BPM range: " + ", ".join(BPM_RANGES) + ", a custom range like 85-95 (plain hyphen accepted) or auto")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset-envelope front end for beat events")
+    parser.add_argument("--incremental", action="store_true", help="Only analyze the audio captured since the previous estimate")
+    parser.add_argument("--block", type=int, default=10240, help="Samples per capture callback")
+    parser.add_argument("--no-native", action="store_true",
+                        help=f"Capture mono at {FRAME_RATE} Hz, converted by the driver, instead of the device's own "
+                             "rate and channels")
+    parser.add_argument("--channels", type=int, default=2, metavar="N",
+                        help="Capture and downmix at most the first N channels (default: 2, 0: all)")
+    parser.add_argument("--hop", type=float, help="Seconds of new audio before each analysis (default: one block)")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--target-latency", type=float, metavar="SECONDS",
+                        help="Warn when a BPM is published later than this after capture")
+    parser.add_argument("--process", action="store_true",
+                        help="Analyze in a worker process reading the capture from shared memory")
+    parser.add_argument("--record", metavar="PATH", help="Save the raw capture to this file for replay")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="Analyze a capture recording instead of an input device, as fast as analyzed")
+    parser.add_argument("--realtime", action="store_true", help="With --replay, pace the replay like the capture")
+    parser.add_argument("--socket", metavar="PATH", help="Publish on this Unix domain socket instead of stdout")
+    parser.add_argument("--no-link", action="store_true", help="Do not publish to Ableton Link")
+    parser.add_argument("--link-threshold", type=float, default=0.05, metavar="BPM",
+                        help="Smallest tempo change published to Link")
+    parser.add_argument("--link-interval", type=float, default=0.25, metavar="SECONDS",
+                        help="Shortest time between two Link tempo updates")
+    parser.add_argument("--no-link-phase", action="store_true",
+                        help="Publish the tempo to Link but leave the beat phase of the session alone")
+    parser.add_argument("--phase-threshold", type=float, default=0.01, metavar="SECONDS",
+                        help="Smallest beat phase error corrected in the Link session")
+    parser.add_argument("--instrumentation-dump", metavar="PATH", help="Append stage timings to this file every 10 s")
+    args = parser.parse_args()
+
+    range_key = parse_range(args.range)
+    if range_key is None:
+        parser.error(f"unknown BPM range: {args.range}")
+    args.range = range_key
+    # The worker process does not tell the replay when it has read a hop
+    if args.replay and args.process and not args.realtime:
+        parser.error("--replay with --process needs --realtime")
+
+    # Console messages go to stderr so that stdout only carries JSON lines
+    results = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        modules = None
+        failed = False
+        try:
+            if args.list_devices:
+                from AudioStreamer import AudioStreamer
+                devices, indices = AudioStreamer(FRAME_RATE).available_audio_devices()
+                for name, index in zip(devices, indices):
+                    print(f"{index}: {name}", file=results)
+                return
+
+            modules = HeadlessModules(args, results)
+            device = args.device
+            if device is None:
+                device = modules.audio_streamer.available_audio_devices()[1][0]
+
+            stop = threading.Event()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda signum, frame: stop.set())
+            if args.replay:
+                modules.audio_streamer.on_finished = stop.set
+
+            modules.bpm_analyzer.start_run_analyzer_thread(input_device_index=device)
+            while not stop.wait(1.0):
+                if modules.bpm_analyzer.error:
+                    raise RuntimeError(f"BPM analysis stopped: {modules.bpm_analyzer.error}")
+            print("⏳ Stopping...")
+        except Exception as e:
+            print(f"❌ Fatal error: {e}")
+            traceback.print_exc()
+            failed = True
+        finally:
+            # Also on errors, so that the socket file and the shared ring do not outlive the daemon
+            if modules is not None:
+                modules.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
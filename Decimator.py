@@ -0,0 +1,84 @@
+import numpy as np
+from math import gcd
+from scipy import signal
+
+# Highest frequency the analysis keeps (the band-pass filter's high cut).
+# Aliases only have to land above it, which lets the anti-aliasing filter
+# be several times shorter than a general purpose resampler's.
+PASSBAND = 3000.0
+
+
+def downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Mean of the channels of interleaved samples, as float32.
+
+    A product with the channel weights is many times faster than mean()
+    over the short rows of interleaved frames.
+    """
+    if channels == 1:
+        return samples.astype(np.float32)
+    return samples.reshape(-1, channels) @ np.full(channels, 1 / channels, dtype=np.float32)
+
+
+def decimation_filter(up: int, down: int, in_rate: int, out_rate: int, passband: float = PASSBAND,
+                      attenuation: float = 60.0) -> np.ndarray:
+    """Kaiser low-pass at out_rate / 2 in the rate in_rate * up, scaled by up for the inserted zeros.
+
+    It is flat up to passband and attenuates by attenuation dB from
+    out_rate - passband on, whose aliases fold down to passband and above.
+    """
+    rate = in_rate * up
+    numtaps, beta = signal.kaiserord(attenuation, (out_rate - 2 * passband) / (rate / 2))
+    # A whole number of taps per output phase
+    numtaps = -(-numtaps // up) * up
+    return signal.firwin(numtaps, out_rate / 2, window=("kaiser", beta), fs=rate) * up
+
+
+class StreamingDecimator:
+    """Polyphase resampling of a stream from in_rate down to out_rate, block by block.
+
+    The ratio out_rate / in_rate is reduced to up / down. Output sample n
+    is the filter applied at position n * down of the input upsampled by
+    up; only the taps of its phase, (n * down) % up, meet input samples, so
+    each output costs taps multiply-adds, about 8 per input sample whatever
+    the rates. The last taps - 1 inputs carry to the next block, so a
+    stream decimated in blocks equals the whole stream decimated at once
+    (scipy.signal.upfirdn with the same filter), within the rounding of
+    float32 to int16. Outputs lag the input by delay seconds.
+    """
+    def __init__(self, in_rate: int, out_rate: int, passband: float = PASSBAND):
+        if out_rate >= in_rate or out_rate <= 2 * passband:
+            raise ValueError(f"Cannot decimate {in_rate} Hz to {out_rate} Hz keeping {passband:g} Hz")
+        divisor = gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // divisor, in_rate // divisor
+        self.filter = decimation_filter(self.up, self.down, in_rate, out_rate, passband)
+        self.taps = len(self.filter) // self.up
+        # bank[p, i] = filter[p + i * up]: the taps of phase p, newest input first
+        self.bank = self.filter.reshape(self.taps, self.up).T.astype(np.float32)
+        self.delay = (len(self.filter) - 1) / 2 / (in_rate * self.up)
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart from silence, e.g. when the stream restarts."""
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Input index of history[0], and upsampled position of the next output
+        self.base = -(self.taps - 1)
+        self.position = 0
+
+    def max_output(self, frames: int) -> int:
+        """Most outputs a block of frames inputs can give."""
+        return -(-frames * self.up // self.down)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Decimate the next block of mono samples, as int16."""
+        x = np.concatenate((self.history, samples.astype(np.float32, copy=False)))
+        end = self.base + len(x)
+        # Outputs whose newest input, position // up, has arrived
+        count = max((end * self.up - 1 - self.position) // self.down + 1, 0)
+        positions = self.position + self.down * np.arange(count, dtype=np.int64)
+        newest = positions // self.up - self.base
+        window = x[newest[:, None] - np.arange(self.taps)]
+        out = np.einsum("ij,ij->i", window, self.bank[positions % self.up])
+        self.history = x[len(x) - (self.taps - 1):]
+        self.base = end - (self.taps - 1)
+        self.position += count * self.down
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
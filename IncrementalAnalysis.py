@@ -0,0 +1,149 @@
+import numpy as np
+from collections import deque
+from BpmPattern import BpmPattern
+
+
+class IncrementalAnalysis:
+    """Sliding-window beat events and tempo votes, updated per new window.
+
+    The batch search anchors the 32 pattern beats at the start of the
+    buffer, so every vote changes when the buffer slides. Votes over the
+    unbounded pattern lattice (every beat of a tempo step, before and after
+    the anchor) only depend on a beat event's phase modulo the beat period:
+    each coarse tempo step keeps a histogram over its period, events of new
+    half-second windows are added, events of windows leaving the buffer are
+    subtracted, and (step, offset) votes are read back for the current
+    anchor. The few events that match outside beats 0 to 31 (the first
+    window, and the end of the buffer at fast tempos) are then voted
+    directly and removed, which gives the batch votes exactly.
+
+    Windows are aligned on the absolute sample clock of the stream rather
+    than on the buffer start. Samples come in already band-pass filtered
+    (see BandpassFilter.StreamingBandpass).
+
+    With the analyzer's onset front end, each window votes with its onsets
+    instead of its loudest sample. They are detected with a little of the
+    previous window as envelope history, and weighted against a running
+    mean strength so that a window's votes can be subtracted exactly. The
+    thresholds then depend on the window, so the votes only approximate
+    the batch ones.
+    """
+    def __init__(self, analyzer, bpm_pattern: BpmPattern, window_seconds: float = 12, tolerance: int = 20):
+        self.analyzer = analyzer
+        self.frame_rate = analyzer.frame_rate
+        self.step_size = self.frame_rate // 2
+        self.window_count = int(self.frame_rate * window_seconds) // self.step_size
+        self.tolerance = tolerance
+        self.onset_detector = analyzer.onset_detector
+        if self.onset_detector:
+            # Onsets in the last blocks of a window are only picked once the
+            # next window shows the envelope falling again
+            self.margin = 2 * self.onset_detector.block
+            self.context_size = self.step_size // 2
+        self.windows = deque()
+        self.set_pattern(bpm_pattern)
+        self.reset(0)
+
+    def reset(self, position: int) -> None:
+        """Forget every window and restart the stream clock at position."""
+        self.position = position
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.context = np.zeros(0, dtype=np.int16)
+        self.scale = None
+        self.windows = deque()
+        self.phases[:] = 0
+
+    def set_pattern(self, bpm_pattern: BpmPattern) -> None:
+        """Switch coarse pattern and rebuild its phase histograms from the kept events."""
+        self.bpm_pattern = bpm_pattern
+        self.periods = np.asarray(bpm_pattern.periods, dtype=np.int64)
+        self.phase_starts = np.concatenate(([0], np.cumsum(self.periods)[:-1]))
+        # Vote counts never exceed the number of kept windows; onset weights
+        # are multiples of 1/16, which float32 sums exactly
+        dtype = np.float32 if self.onset_detector else np.int16
+        self.phases = np.zeros(int(self.periods.sum()), dtype=dtype)
+        for _, events, weights in self.windows:
+            self._vote(events, weights, 1)
+
+    def _vote(self, events: np.ndarray, weights: np.ndarray, sign: int) -> None:
+        spread = np.arange(-self.tolerance, self.tolerance + 1, dtype=np.int64)
+        for i, beat_event in enumerate(events):
+            index = self.phase_starts[:, None] + (beat_event + spread[None, :]) % self.periods[:, None]
+            # The 2 * tolerance + 1 phases of one step are distinct, so += is safe
+            self.phases[index] += sign if weights is None else sign * weights[i]
+
+    def window_events(self, window: np.ndarray, window_start: int) -> tuple:
+        """Absolute beat events of one window and their weights (None when unweighted)."""
+        if not self.onset_detector:
+            return self.analyzer.search_beat_events(window, self.frame_rate)[:1] + window_start, None
+        signal_array = np.concatenate((self.context, window))
+        self.context = signal_array[-self.context_size:]
+        events, strengths = self.onset_detector.onsets(signal_array, len(signal_array) - len(window) - self.margin)
+        keep = events < len(signal_array) - self.margin
+        events, strengths = events[keep], strengths[keep]
+        if strengths.size:
+            mean = float(strengths.mean())
+            self.scale = mean if self.scale is None else 0.9 * self.scale + 0.1 * mean
+        weights = self.onset_detector.weights(strengths, self.scale)
+        return events + window_start - (len(signal_array) - len(window)), weights
+
+    def update(self, samples: np.ndarray) -> None:
+        """Add new filtered samples and vote with the beat events of completed windows."""
+        self.position += len(samples)
+        self.pending = np.concatenate((self.pending, samples))
+        window_start = self.position - len(self.pending)
+        while len(self.pending) >= self.step_size:
+            window = self.pending[:self.step_size]
+            self.pending = self.pending[self.step_size:]
+            events, weights = self.window_events(window, window_start)
+            self.windows.append((window_start, events, weights))
+            self._vote(events, weights, 1)
+            if len(self.windows) > self.window_count:
+                _, old_events, old_weights = self.windows.popleft()
+                self._vote(old_events, old_weights, -1)
+            window_start += self.step_size
+
+    def anchor(self) -> int:
+        """Absolute sample the offsets are measured from: start of the oldest window."""
+        return self.windows[0][0] if self.windows else self.position
+
+    def beat_events(self) -> np.ndarray:
+        """Beat events of the kept windows, relative to the anchor."""
+        if not self.windows:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([events for _, events, _ in self.windows]) - self.anchor()
+
+    def weights(self) -> np.ndarray:
+        """Weights of beat_events(), None when unweighted."""
+        if not self.onset_detector or not self.windows:
+            return None
+        return np.concatenate([weights for _, _, weights in self.windows])
+
+    def bpm_container(self, bpm_pattern: BpmPattern, steps: int) -> np.ndarray:
+        """Votes for every (tempo step, offset), like BpmAnalyzer.bpm_container.
+
+        Votes for the coarse pattern come from the phase histograms; other
+        patterns (the fine window) are voted directly.
+        """
+        beat_events, weights = self.beat_events(), self.weights()
+        if bpm_pattern is not self.bpm_pattern:
+            return self.analyzer.bpm_container(beat_events, bpm_pattern, steps, weights)
+        offsets = bpm_pattern.jump * np.arange(1, bpm_pattern.offsets + 1, dtype=np.int64)
+        index = self.phase_starts[:, None] + (self.anchor() + offsets[None, :]) % self.periods[:, None]
+        bpm_container = self.phases[index].astype(np.int64 if weights is None else np.float64)
+        if not beat_events.size:
+            return bpm_container
+        shortest = int(self.periods.min())
+        lowest = -((offsets[-1] + self.tolerance) // shortest) - 1
+        highest = (int(beat_events.max()) + self.tolerance) // shortest + 1
+        # Negative beat numbers only reach events up to the last offset,
+        # beat numbers from 32 only events after 32 of the shortest periods
+        before = beat_events <= offsets[-1] + self.tolerance
+        if before.any():
+            bpm_container -= bpm_pattern.votes(beat_events[before], self.tolerance, range(lowest, 0),
+                                               None if weights is None else weights[before])
+        after = beat_events >= bpm_pattern.beats * shortest - self.tolerance
+        if after.any():
+            bpm_container -= bpm_pattern.votes(beat_events[after], self.tolerance, range(bpm_pattern.beats, highest + 1),
+                                               None if weights is None else weights[after])
+        return bpm_container
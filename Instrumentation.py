@@ -0,0 +1,158 @@
+import json
+import threading
+import traceback
+from time import perf_counter, time
+
+# Histogram bins from 1 µs to 10 s, four per decade. numpy is only imported
+# for snapshots, so that creating the instrumentation stays cheap at startup.
+HISTOGRAM_EDGES_MS = [10 ** (i / 4 - 3) for i in range(29)]
+
+
+class RollingHistogram:
+    """Last `size` values of one stage (in seconds) and when they were recorded.
+
+    Recording only stores into preallocated lists; percentiles and the
+    histogram are computed when a snapshot is taken. Each stage is recorded
+    by a single thread, snapshots may be taken from any thread.
+    """
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.values = [0.0] * size
+        self.times = [0.0] * size
+        self.count = 0
+        self.last = 0.0
+        self.last_time = 0.0
+        self.started = 0.0
+
+    def add(self, value: float, now: float) -> None:
+        i = self.count % self.size
+        self.values[i] = value
+        self.times[i] = now
+        self.last = value
+        self.last_time = now
+        self.count += 1
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        now = perf_counter()
+        self.add(now - self.started, now)
+        return False
+
+    def snapshot(self) -> dict:
+        import numpy as np
+        kept = min(self.count, self.size)
+        if not kept:
+            return {"count": 0}
+        values = np.array(self.values[:kept]) * 1000
+        times = np.array(self.times[:kept])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        span = times.max() - times.min()
+        return {
+            "count": self.count,
+            "mean_ms": round(float(values.mean()), 4),
+            "p50_ms": round(float(p50), 4),
+            "p95_ms": round(float(p95), 4),
+            "p99_ms": round(float(p99), 4),
+            "max_ms": round(float(values.max()), 4),
+            "per_s": round((kept - 1) / span, 2) if span > 0 else None,
+            "histogram": np.histogram(values, HISTOGRAM_EDGES_MS)[0].tolist(),
+        }
+
+
+class Instrumentation:
+    """Per-stage latency histograms and event counters of the capture and analysis.
+
+    Code under measurement wraps each stage in `with instrumentation.stage(name):`
+    and counts events with count(name). snapshot() returns the current
+    statistics; start_dump() appends one snapshot per interval to a JSON
+    lines file.
+    """
+    enabled = True
+
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.stages = {}
+        self.counters = {}
+        self.created = perf_counter()
+        self.stop_dumping = threading.Event()
+
+    def stage(self, name: str) -> RollingHistogram:
+        """Histogram of a stage, also a context manager timing one run of it."""
+        try:
+            return self.stages[name]
+        except KeyError:
+            return self.stages.setdefault(name, RollingHistogram(self.size))
+
+    def record(self, name: str, value: float) -> None:
+        """Record a value in seconds that is not a timed block, e.g. a buffer age."""
+        self.stage(name).add(value, perf_counter())
+
+    def count(self, name: str, increment: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    def snapshot(self) -> dict:
+        stages = {name: histogram.snapshot() for name, histogram in list(self.stages.items())}
+        iteration = stages.get("iteration", {})
+        return {
+            "time": time(),
+            "uptime_s": round(perf_counter() - self.created, 1),
+            "iterations_per_s": iteration.get("per_s"),
+            "counters": dict(self.counters),
+            "stages": stages,
+            "histogram_edges_ms": [round(edge, 4) for edge in HISTOGRAM_EDGES_MS],
+        }
+
+    def start_dump(self, path: str, interval: float = 10.0) -> None:
+        """Append a snapshot to path every interval seconds, from a daemon thread."""
+        self.stop_dumping.clear()
+        threading.Thread(target=self._dump, args=(path, interval), daemon=True).start()
+        print(f"✅ Instrumentation dumped to {path} every {interval:g} s")
+
+    def stop_dump(self) -> None:
+        self.stop_dumping.set()
+
+    def _dump(self, path: str, interval: float) -> None:
+        while not self.stop_dumping.wait(interval):
+            try:
+                with open(path, "a") as f:
+                    f.write(json.dumps(self.snapshot()) + "\n")
+            except Exception as e:
+                print(f"❌ Error dumping instrumentation: {e}")
+                traceback.print_exc()
+                return
+
+
+class _NullStage:
+    count = 0
+    last = 0.0
+    last_time = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullInstrumentation:
+    """Stand-in used when instrumentation is disabled: every call does nothing."""
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return self._stage
+
+    def record(self, name: str, value: float) -> None:
+        pass
+
+    def count(self, name: str, increment: int = 1) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {}
+
+
+DISABLED = NullInstrumentation()
@@ -0,0 +1,77 @@
+import numpy as np
+from scipy import signal
+
+
+class OnsetDetector:
+    """Onset times and strengths from the band-passed signal, at a reduced rate.
+
+    The signal is rectified and decimated to envelope_rate by taking the
+    peak of every block, the only full-rate work. The rise of the log
+    envelope above its own slow average is the onset strength; peaks at
+    least min_spacing apart are picked, and each is located on the sample
+    of largest amplitude around it so the voting tolerance still applies.
+
+    Weights are the strengths normalised to a mean of 1 and quantised to
+    1/16, so that weighted vote sums are exact and can be subtracted again.
+    """
+    def __init__(self, frame_rate: int = 11025, envelope_rate: int = 441, min_spacing: float = 0.1,
+                 average: float = 0.1, threshold: float = 1.0):
+        self.frame_rate = frame_rate
+        self.block = max(frame_rate // envelope_rate, 1)
+        self.envelope_rate = frame_rate / self.block
+        self.min_spacing = max(int(min_spacing * self.envelope_rate), 1)
+        # One-pole average of the envelope over `average` seconds
+        pole = np.exp(-1 / (average * self.envelope_rate))
+        self.average = ([1 - pole], [1, -pole])
+        self.average_zi = signal.lfilter_zi(*self.average)
+        self.threshold = threshold
+
+    def envelope(self, signal_array: np.ndarray) -> np.ndarray:
+        """Log peak amplitude of every block, of int16 samples (the capture's) or any other numeric dtype."""
+        blocks = signal_array[:len(signal_array) // self.block * self.block].reshape(-1, self.block)
+        magnitude = np.abs(blocks)
+        if blocks.dtype == np.int16:
+            # abs(-32768) wraps in int16 but is right once read as uint16
+            magnitude = magnitude.view(np.uint16)
+        # Reducing over the outer axis of the transpose is the fast layout.
+        peak = magnitude.T.max(axis=0)
+        return np.log1p(peak.astype(np.float32))
+
+    def strength(self, envelope: np.ndarray) -> np.ndarray:
+        """Rise of the envelope above its average up to the previous block."""
+        average, _ = signal.lfilter(*self.average, envelope, zi=self.average_zi * envelope[0])
+        rise = np.zeros_like(envelope)
+        rise[1:] = envelope[1:] - average[:-1]
+        return np.maximum(rise, 0)
+
+    def onsets(self, signal_array: np.ndarray, start: int = 0) -> tuple:
+        """Onset sample positions at or after start, and their raw strengths.
+
+        Samples before start only give the envelope some history, so the
+        beginning of the analysed part is not mistaken for an onset.
+        """
+        envelope = self.envelope(signal_array)
+        if len(envelope) < 2:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        strength = self.strength(envelope)
+        height = strength.mean() + self.threshold * strength.std()
+        peaks, properties = signal.find_peaks(strength, height=height, distance=self.min_spacing)
+        # Sample of largest amplitude in the peak block and the one after it
+        lo = peaks * self.block
+        index = np.minimum(lo[:, None] + np.arange(2 * self.block)[None, :], len(signal_array) - 1)
+        segments = np.abs(signal_array[index].astype(np.int32))
+        events = lo + segments.argmax(axis=1)
+        keep = (events >= start) & (events < len(signal_array))
+        return events[keep].astype(np.int64), properties["peak_heights"][keep]
+
+    def weights(self, strengths: np.ndarray, scale: float = None) -> np.ndarray:
+        """Vote weights: strengths divided by scale (default their mean), in 1/16 steps, at least 1/16."""
+        if not strengths.size:
+            return strengths
+        scale = strengths.mean() if scale is None else scale
+        return np.maximum(np.round(strengths / scale * 16), 1) / 16
+
+    def detect(self, signal_array: np.ndarray, start: int = 0) -> tuple:
+        """Onset sample positions and vote weights of a whole buffer."""
+        events, strengths = self.onsets(signal_array, start)
+        return events, self.weights(strengths)
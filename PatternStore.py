@@ -0,0 +1,112 @@
+import numpy as np
+import os
+import json
+import zlib
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from ExtractBpmPatterns import compact_dtype, save_atomic
+from BpmPattern import BpmPattern, offsets_for
+
+# Tempo steps of the coarse and fine tables
+COARSE_STEP_BPM = 0.25
+FINE_STEP_BPM = 0.05
+
+# Everything a table depends on. kind is "coarse" (first tempo one step
+# above start_bpm - 10) or "fine" (first tempo start_bpm - 10), see
+# BpmPattern; offsets is the number of offsets of the half-second window.
+PatternKey = namedtuple("PatternKey", "kind frame_rate start_bpm width step offsets")
+
+
+class PatternStore:
+    """Memory-mapped BPM patterns, built on demand and cached by what they depend on.
+
+    Each table holds the beat period of every tempo step of a range and is
+    keyed by PatternKey, so any range and step size can be requested and
+    the tables of another frame rate are never reused. A table is saved
+    with a JSON file holding its key and a CRC32 of its content; a table
+    whose key or checksum does not match is rebuilt. The max_ranges ranges
+    used last stay mapped.
+    """
+    def __init__(self, patterns_dir: Path, frame_rate: int = 11025, width: int = 100, max_ranges: int = 8,
+                 coarse_step: float = COARSE_STEP_BPM, fine_step: float = FINE_STEP_BPM):
+        self.patterns_dir = Path(patterns_dir)
+        self.frame_rate = frame_rate
+        self.width = width
+        self.max_ranges = max_ranges
+        self.coarse_step = coarse_step
+        self.fine_step = fine_step
+        self.lock = threading.Lock()
+        # (start BPM, width) -> (coarse, fine), least recently used first
+        self._patterns = OrderedDict()
+
+    def keys(self, start_bpm: float, width: float = None) -> tuple:
+        """Coarse and fine table keys of a range."""
+        width = self.width if width is None else width
+        offsets = offsets_for(self.frame_rate)
+        return (PatternKey("coarse", self.frame_rate, start_bpm, width, self.coarse_step, offsets),
+                PatternKey("fine", self.frame_rate, start_bpm, width, self.fine_step, offsets))
+
+    def paths(self, key: PatternKey) -> tuple:
+        """Table and checksum files of a key."""
+        stem = (f"{key.kind}_{key.frame_rate}hz_{key.start_bpm:g}bpm_{key.width:g}wide_"
+                f"{key.step:g}step_{key.offsets}offsets")
+        return self.patterns_dir / f"{stem}.npy", self.patterns_dir / f"{stem}.json"
+
+    def get(self, start_bpm: float, width: float = None, range_key: str = None) -> tuple:
+        """Return (coarse, fine) BpmPattern for a range, width defaulting to the store's.
+
+        range_key names the range in the message shown if the tables have to
+        be generated; the predefined ranges share tables wider than some of them.
+        """
+        width = self.width if width is None else width
+        with self.lock:
+            patterns = self._patterns.get((start_bpm, width))
+            if patterns is None:
+                patterns = tuple(self._open(key, range_key) for key in self.keys(start_bpm, width))
+                self._patterns[(start_bpm, width)] = patterns
+                # Analyzers keep the patterns they use alive after eviction
+                while len(self._patterns) > self.max_ranges:
+                    self._patterns.popitem(last=False)
+            else:
+                self._patterns.move_to_end((start_bpm, width))
+            return patterns
+
+    def nbytes(self) -> int:
+        """Bytes mapped for the ranges held."""
+        with self.lock:
+            return sum(p.periods.nbytes for pair in self._patterns.values() for p in pair)
+
+    def _open(self, key: PatternKey, range_key: str = None) -> BpmPattern:
+        try:
+            return self._load(key)
+        except (OSError, ValueError):
+            range_key = range_key or f"{key.start_bpm:g}–{key.start_bpm + key.width:g}"
+            print(f"⏳ Generating {key.kind} BPM pattern for {range_key} BPM "
+                  f"at {key.frame_rate} Hz in {self.patterns_dir}...")
+            self._build(key)
+            return self._load(key)
+
+    def _build(self, key: PatternKey) -> None:
+        build = BpmPattern.coarse if key.kind == "coarse" else BpmPattern.fine
+        periods = build(key.frame_rate, key.start_bpm, key.width, key.step).periods
+        periods = periods.astype(compact_dtype(periods))
+        table_path, checksum_path = self.paths(key)
+        os.makedirs(self.patterns_dir, exist_ok=True)
+        save_atomic(str(table_path), periods)
+        # Written last: a table without its checksum file is rebuilt
+        tmp_path = f"{checksum_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key._asdict(), "crc32": zlib.crc32(periods.tobytes())}, f)
+        os.replace(tmp_path, checksum_path)
+
+    def _load(self, key: PatternKey) -> BpmPattern:
+        table_path, checksum_path = self.paths(key)
+        with open(checksum_path) as f:
+            checksum = json.load(f)
+        periods = np.load(str(table_path), mmap_mode="r")
+        if checksum.get("key") != key._asdict() or checksum.get("crc32") != zlib.crc32(periods.tobytes()):
+            raise ValueError(f"Checksum mismatch in {table_path}")
+        if periods.shape != (int((key.width + 10) / key.step),):
+            raise ValueError(f"Unexpected pattern shape in {table_path}")
+        return BpmPattern(periods, key.offsets)
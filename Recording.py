@@ -0,0 +1,173 @@
+"""
+Capture recordings: the int16 input with callback timestamps, and replay
+
+A recording is a header followed by one record per capture block:
+
+    header  "BPMCAP01", frame rate (uint32), channels (uint32), start time (float64, Unix)
+    block   seconds since the start (float64), samples (uint32), flags (uint32), samples (int16)
+
+all little-endian. Blocks are recorded as the analysis receives them, after
+the downmix and decimation of native capture. Flag 1 marks a block
+PortAudio reported an input overflow for. ReplayStreamer feeds a recording
+through the same rings, band-pass and analyzer wake-up as AudioStreamer,
+paced like the capture or as fast as the analyzer takes it.
+"""
+
+import struct
+import threading
+import traceback
+from queue import SimpleQueue
+from time import perf_counter, time, sleep
+
+import numpy as np
+
+from CaptureSource import CaptureSource
+from Instrumentation import DISABLED
+
+MAGIC = b"BPMCAP01"
+HEADER = struct.Struct("<8sIId")
+BLOCK = struct.Struct("<dII")
+OVERFLOW = 1
+
+
+class CaptureRecorder:
+    """Append capture blocks to a recording from a thread of its own, so the callback never waits on the disk."""
+    def __init__(self, path: str, frame_rate: int, channels: int = 1):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, frame_rate, channels, time()))
+        self.started = perf_counter()
+        self.blocks = SimpleQueue()
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+        print(f"✅ Recording the capture to {path}")
+
+    def write(self, samples: np.ndarray, overflow: bool = False) -> None:
+        """Queue a block of int16 samples (callback thread)."""
+        self.blocks.put((perf_counter() - self.started, samples.astype("<i2", copy=False).tobytes(), overflow))
+
+    def close(self) -> None:
+        """Write what is queued and close the file."""
+        self.blocks.put(None)
+        self.writer.join()
+        self.file.close()
+        print(f"✅ Recording saved to {self.path}")
+
+    def _write(self) -> None:
+        while True:
+            block = self.blocks.get()
+            if block is None:
+                return
+            seconds, data, overflow = block
+            try:
+                self.file.write(BLOCK.pack(seconds, len(data) // 2, OVERFLOW if overflow else 0))
+                self.file.write(data)
+            except Exception as e:
+                print(f"❌ Error writing the recording: {e}")
+                traceback.print_exc()
+
+
+def write_recording(path: str, samples: np.ndarray, frame_rate: int, block: int = 10240) -> None:
+    """Save int16 audio (e.g. a WAV file or a synthetic track) as a recording of evenly timed blocks."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, frame_rate, 1, time()))
+        for start in range(0, len(samples), block):
+            data = samples[start:start + block].astype("<i2", copy=False)
+            f.write(BLOCK.pack((start + len(data)) / frame_rate, len(data), 0))
+            f.write(data.tobytes())
+
+
+class CaptureRecording:
+    """A recording opened for reading, memory-mapped."""
+    def __init__(self, path: str):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, self.frame_rate, self.channels, self.started = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a capture recording")
+
+    def blocks(self):
+        """(seconds since the start, int16 samples, overflow) of every block, in order.
+
+        A block cut short by a crash while recording is ignored.
+        """
+        offset = HEADER.size
+        while offset + BLOCK.size <= len(self.data):
+            seconds, count, flags = BLOCK.unpack_from(self.data, offset)
+            offset += BLOCK.size
+            if offset + 2 * count > len(self.data):
+                return
+            yield seconds, np.frombuffer(self.data, dtype="<i2", count=count, offset=offset), bool(flags & OVERFLOW)
+            offset += 2 * count
+
+    def samples(self) -> np.ndarray:
+        """Every sample of the recording, concatenated."""
+        return np.concatenate([samples for _, samples, _ in self.blocks()] or [np.zeros(0, dtype="<i2")])
+
+    def duration(self) -> float:
+        return sum(len(samples) for _, samples, _ in self.blocks()) / (self.frame_rate * self.channels)
+
+
+class ReplayStreamer(CaptureSource):
+    """AudioStreamer stand-in feeding a recording instead of an input device.
+
+    Blocks go through the same rings, band-pass and hop wake-up as live
+    capture. With realtime, each block is written when it was captured,
+    relative to the first. Otherwise the replay runs as fast as the
+    analyzer takes it: once a hop is ready it waits until the analyzer has
+    read it, so every run analyzes the same buffers. on_finished, if set,
+    is called once the recording is exhausted.
+    """
+    def __init__(self, path: str, operating_range_seconds: float = 12, instrumentation=DISABLED,
+                 hop_seconds: float = None, shared: bool = False, realtime: bool = False):
+        self.recording = CaptureRecording(path)
+        if self.recording.channels != 1:
+            raise ValueError(f"Only mono recordings can be replayed, {path} has {self.recording.channels} channels")
+        chunk = max((len(samples) for _, samples, _ in self.recording.blocks()), default=1)
+        super().__init__(self.recording.frame_rate, operating_range_seconds, instrumentation, chunk, hop_seconds, shared)
+        self.realtime = realtime
+        self.running = False
+        self.thread = None
+        self.finished = threading.Event()
+        self.on_finished = None
+
+    def available_audio_devices(self) -> list:
+        return [[f"Replay of {self.recording.path}"], [0]]
+
+    def start_stream(self, input_device_index=None) -> None:
+        self.reset()
+        self.finished.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._replay, daemon=True)
+        self.thread.start()
+        print(f"✅ Replaying {self.recording.path} ({'real time' if self.realtime else 'as fast as analyzed'})")
+
+    def stop_stream(self) -> None:
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _replay(self) -> None:
+        started, first = perf_counter(), None
+        for seconds, samples, overflow in self.recording.blocks():
+            if not self.running:
+                return
+            if self.realtime:
+                first = seconds if first is None else first
+                sleep(max(started + seconds - first - perf_counter(), 0))
+            self.buffer_read.clear()
+            self.write_block(samples, overflow)
+            if not self.realtime and self.buffer_updated.is_set():
+                self._wait_read()
+        # Let the analyzer take what is left of the last hop
+        if not self.realtime and self.running and self.filtered_buffer.position > self.read_position:
+            self.buffer_read.clear()
+            self.buffer_updated.set()
+            self._wait_read()
+        self.finished.set()
+        if self.on_finished:
+            self.on_finished()
+
+    def _wait_read(self) -> None:
+        while self.running and not self.buffer_read.wait(0.1):
+            pass
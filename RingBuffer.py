@@ -0,0 +1,111 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class RingBuffer:
+    """Preallocated sample ring buffer for one writer and one reader thread.
+
+    Samples are stored twice, at i and i + size, so the latest samples are
+    always one contiguous slice of the storage: view() hands it out without
+    copying and latest() with a single copy.
+
+    Contract: write() is only called from one thread (the PortAudio
+    callback) with at most `headroom` samples per call, and view()/latest()
+    from one other thread. The writer copies the samples first and publishes
+    `position` last. A view stays valid until the writer has added
+    capacity - len(view) more samples; latest() checks this after copying
+    and copies again if it was lapped.
+
+    The reader may be another process: a ring created with shared() keeps
+    its samples and position in shared memory, and attach() opens it by
+    name in the reader process.
+    """
+    def __init__(self, capacity: int, headroom: int, dtype=np.int16, buffer=None):
+        self.capacity = capacity
+        self.headroom = headroom
+        self.size = capacity + headroom
+        self.dtype = np.dtype(dtype)
+        self.shared_memory = None
+        if buffer is None:
+            self.counter = np.zeros(1, dtype=np.int64)
+            self.data = np.zeros(2 * self.size, dtype=dtype)
+        else:
+            # Position first, then the samples
+            self.counter = np.ndarray(1, dtype=np.int64, buffer=buffer)
+            self.data = np.ndarray(2 * self.size, dtype=dtype, buffer=buffer, offset=self.counter.nbytes)
+
+    @staticmethod
+    def nbytes(capacity: int, headroom: int, dtype=np.int16) -> int:
+        """Bytes of shared memory a ring needs."""
+        return np.dtype(np.int64).itemsize + 2 * (capacity + headroom) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def shared(cls, capacity: int, headroom: int, dtype=np.int16) -> "RingBuffer":
+        """Ring in a new shared memory block; release it with close(unlink=True)."""
+        memory = shared_memory.SharedMemory(create=True, size=cls.nbytes(capacity, headroom, dtype))
+        ring = cls(capacity, headroom, dtype, memory.buf)
+        ring.counter[0] = 0
+        ring.shared_memory = memory
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, headroom: int, dtype=np.int16) -> "RingBuffer":
+        """Open the shared ring of another process by its shared_memory name."""
+        # A process spawned by the creator shares its resource tracker, so
+        # the block is still only removed by the creator's close(unlink=True)
+        memory = shared_memory.SharedMemory(name=name)
+        ring = cls(capacity, headroom, dtype, memory.buf)
+        ring.shared_memory = memory
+        return ring
+
+    def close(self, unlink: bool = False) -> None:
+        """Release the shared memory of the ring, removing it with unlink (creator only)."""
+        if self.shared_memory is None:
+            return
+        # numpy views must go before the block can be closed
+        self.counter, self.data = np.zeros(1, dtype=np.int64), np.zeros(2 * self.size, dtype=self.dtype)
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+        self.shared_memory = None
+
+    @property
+    def position(self) -> int:
+        """Samples written since creation."""
+        return int(self.counter[0])
+
+    @position.setter
+    def position(self, value: int) -> None:
+        self.counter[0] = value
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples (writer thread only)."""
+        count = len(samples)
+        samples = samples[-self.size:]
+        start = (self.position + count - len(samples)) % self.size
+        first = min(len(samples), self.size - start)
+        for offset in (0, self.size):
+            self.data[offset + start:offset + start + first] = samples[:first]
+            self.data[offset:offset + len(samples) - first] = samples[first:]
+        self.position += count
+
+    def view(self, count: int = None, since: int = None) -> tuple:
+        """Latest samples without copying, and the position at their end.
+
+        Returns count samples, or those written after position since, or
+        else the whole buffer; never more than capacity.
+        """
+        position = self.position
+        if since is not None:
+            count = max(position - since, 0)
+        count = min(self.capacity if count is None else count, self.capacity, position)
+        end = position % self.size + self.size
+        return self.data[end - count:end], position
+
+    def latest(self, count: int = None, since: int = None) -> tuple:
+        """Copy of the latest samples, selected like view(), and the position at their end."""
+        while True:
+            view, position = self.view(count, since)
+            buffer = view.copy()
+            if self.position - position <= self.capacity - len(buffer):
+                return buffer, position
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Analyze several input devices at once, one tempo reading per device
+
+Each device gets a session: its own capture rings, analyzer and BPM
+storage, and its own output (a JSON lines file per session, or stdout).
+All analyzers share one read-only pattern store, so memory grows with the
+number of capture rings rather than with the pattern tables. Analysis is
+scheduled on a pool of worker threads sized to the cores; at most one
+analysis per session runs at a time.
+
+The threads share the interpreter lock: with a long analysis (auto range,
+onsets, a short hop) or many sessions, --process gives every session a
+worker process instead (see AnalysisProcess), which maps the same pattern
+files, so the tables are still held in memory once.
+
+Usage:
+    python3 Sessions.py --list-devices
+    python3 Sessions.py --device Mixer=2 --device "Room mic=5" --device Stage=7
+    python3 Sessions.py --device Mixer=2 --device Stage=7 --output-dir tempos --link Mixer
+    python3 Sessions.py --device Mixer=2 --device Stage=7 --process --block 512 --hop 0.25 --window 8
+"""
+
+import os
+import sys
+import json
+import argparse
+import contextlib
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from BpmAnalizer import BpmAnalyzer, BPM_RANGES, TEMPO_ENGINES
+from AnalysisProcess import ProcessAnalyzer
+from AnalysisOptions import parse_range
+from BpmStorage import BpmStorage
+from PatternStore import PatternStore
+import PathUtils
+
+FRAME_RATE = 11025
+
+
+class SessionOutput:
+    """Where a session's BPM goes: one JSON line per estimate, to a file or a stream (stdout by default)."""
+    def __init__(self, name: str, path: str = None, stream=None):
+        self.name = name
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a") if path else (stream or sys.stdout)
+
+    def set_bpm(self, value=None) -> None:
+        line = json.dumps({"session": self.name, "time": round(time(), 3), "bpm": value})
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self) -> None:
+        if self.path:
+            self.file.close()
+
+
+class NoLink:
+    """Stand-in for AbletonLink in the sessions that do not publish to Link."""
+    def enable(self, enabled: bool) -> None:
+        pass
+
+    def set_bpm(self, bpm: float) -> None:
+        pass
+
+    def set_beat(self, beat_time: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class Session:
+    """One input device with its own capture, analyzer, BPM storage and output.
+
+    A session is the `module` of its analyzer: it has the audio_streamer,
+    bpm_storage and ableton_link attributes BpmAnalyzer uses. Capture and
+    analysis take the options of Daemon.py; with process, the analyzer is a
+    ProcessAnalyzer running on its own, otherwise SessionManager schedules
+    its steps.
+    """
+    def __init__(self, name: str, device_index: int, pattern_store: PatternStore, output: SessionOutput,
+                 ableton_link=None, frame_rate: int = FRAME_RATE, range_key: str = "60–160",
+                 engine: str = TEMPO_ENGINES[0], onsets: bool = False, incremental: bool = False,
+                 block: int = 10240, hop_seconds: float = None, window_seconds: float = 12, native: bool = True,
+                 channels: int = 2, target_latency: float = None, process: bool = False):
+        self.name = name
+        self.device_index = device_index
+        self.process = process
+        self.bpm_storage = BpmStorage()
+        self.output = output
+        self.ableton_link = ableton_link or NoLink()
+        # Imported here so that NoLink can be used without PyAudio
+        from AudioStreamer import AudioStreamer
+        self.audio_streamer = AudioStreamer(frame_rate, window_seconds, chunk=block, hop_seconds=hop_seconds,
+                                            shared=process, native=native, max_channels=channels)
+        if process:
+            # The worker maps the pattern files itself
+            self.bpm_analyzer = ProcessAnalyzer(self, frame_rate, incremental, window_seconds, onsets=onsets,
+                                                engine=engine, target_latency=target_latency, label=f"[{name}] ")
+        else:
+            self.bpm_analyzer = BpmAnalyzer(self, frame_rate=frame_rate, engine=engine, onsets=onsets,
+                                            incremental=incremental, window_seconds=window_seconds,
+                                            pattern_store=pattern_store, target_latency=target_latency)
+            self.bpm_analyzer.label = f"[{name}] "
+        self.bpm_analyzer.add_output("output", output.set_bpm)
+        if ableton_link:
+            self.bpm_analyzer.add_output("link", ableton_link.set_bpm)
+            self.bpm_analyzer.add_phase_output("link_phase", ableton_link.set_beat)
+        self.bpm_analyzer.change_bpm_pattern(range_key)
+
+    def start(self) -> None:
+        if self.process:
+            self.bpm_analyzer.start_run_analyzer_thread(self.device_index)
+            return
+        self.audio_streamer.start_stream(input_device_index=self.device_index)
+        self.ableton_link.enable(True)
+
+    def stop(self) -> None:
+        if self.process:
+            self.bpm_analyzer.stop_run_analyzer_thread()
+            return
+        self.audio_streamer.stop_stream()
+        self.ableton_link.enable(False)
+
+    def close(self) -> None:
+        """End the worker process, if any, and release the capture."""
+        if self.process:
+            self.bpm_analyzer.close()
+        self.audio_streamer.close()
+        self.output.close()
+
+
+class SessionManager:
+    """Sessions of several devices, analyzed on a shared worker pool.
+
+    A dispatcher thread submits a session's next analysis as soon as it has
+    new audio and its previous analysis is done. Sessions with a worker
+    process analyze on their own and are only started and stopped.
+    """
+    def __init__(self, sessions: list, workers: int = None, poll: float = 0.01):
+        self.sessions = sessions
+        self.pooled = [session for session in sessions if not session.process]
+        self.workers = workers or os.cpu_count()
+        self.poll = poll
+        self.stopping = threading.Event()
+        self.pool = None
+        self.dispatcher = None
+
+    def start(self) -> None:
+        self.stopping.clear()
+        for session in self.sessions:
+            session.start()
+        if self.pooled:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+            self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self.dispatcher.start()
+        processes = len(self.sessions) - len(self.pooled)
+        print(f"✅ {len(self.sessions)} session(s) running: {len(self.pooled)} on {self.workers} worker thread(s), "
+              f"{processes} in worker processes")
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.dispatcher:
+            self.dispatcher.join()
+        if self.pool:
+            self.pool.shutdown(wait=True)
+        for session in self.sessions:
+            try:
+                session.stop()
+            except Exception as e:
+                print(f"❌ Error stopping session {session.name}: {e}")
+                traceback.print_exc()
+        print("✅ Sessions stopped.")
+
+    def _dispatch(self) -> None:
+        running = {}
+        while not self.stopping.is_set():
+            for session in self.pooled:
+                future = running.get(session.name)
+                if future is not None:
+                    if not future.done():
+                        continue
+                    if future.exception():
+                        print(f"❌ Error in session {session.name}: {future.exception()}")
+                    del running[session.name]
+                if session.audio_streamer.buffer_updated.is_set():
+                    running[session.name] = self.pool.submit(session.bpm_analyzer.analyze_step)
+            self.stopping.wait(self.poll)
+        for future in running.values():
+            future.cancel()
+
+
+def parse_device(spec: str) -> tuple:
+    """NAME=INDEX, or a bare INDEX named after it."""
+    name, _, index = spec.rpartition("=")
+    return (name or f"device {index}"), int(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Detect the BPM of several audio input devices at once",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--device", action="append", default=[], metavar="NAME=INDEX",
+                        help="Input device to analyze, repeat for each session")
+    parser.add_argument("--list-devices", action="store_true", help="List input devices and exit")
+    parser.add_argument("--range", default="60–160",
+                        help="BPM range: " + ", ".join(BPM_RANGES) + ", a custom range like 85-95 (plain hyphen accepted) or auto")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset-envelope front end for beat events")
+    parser.add_argument("--incremental", action="store_true", help="Only analyze the audio captured since the previous estimate")
+    parser.add_argument("--block", type=int, default=10240, help="Samples per capture callback")
+    parser.add_argument("--no-native", action="store_true",
+                        help=f"Capture mono at {FRAME_RATE} Hz, converted by the driver, instead of the device's own "
+                             "rate and channels")
+    parser.add_argument("--channels", type=int, default=2, metavar="N",
+                        help="Capture and downmix at most the first N channels (default: 2, 0: all)")
+    parser.add_argument("--hop", type=float, help="Seconds of new audio before each analysis (default: one block)")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--target-latency", type=float, metavar="SECONDS",
+                        help="Warn when a BPM is published later than this after capture")
+    parser.add_argument("--process", action="store_true",
+                        help="Analyze every session in a worker process instead of the shared thread pool")
+    parser.add_argument("--output-dir", help="Write each session to NAME.jsonl here instead of stdout")
+    parser.add_argument("--link", metavar="NAME", help="Session whose tempo is published to Ableton Link")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Analysis worker threads")
+    args = parser.parse_args()
+
+    # Console messages go to stderr so that stdout only carries JSON lines;
+    # worker processes started meanwhile send theirs to stderr as well
+    results = sys.stdout
+    if args.list_devices:
+        from AudioStreamer import AudioStreamer
+        with contextlib.redirect_stdout(sys.stderr):
+            devices, indices = AudioStreamer(FRAME_RATE).available_audio_devices()
+        for name, index in zip(devices, indices):
+            print(f"{index}: {name}", file=results)
+        return
+
+    range_key = parse_range(args.range)
+    if range_key is None:
+        parser.error(f"unknown BPM range: {args.range}")
+    try:
+        devices = [parse_device(spec) for spec in args.device]
+    except ValueError:
+        parser.error("devices are given as NAME=INDEX")
+    if not devices:
+        parser.error("at least one --device is needed")
+    names = [name for name, _ in devices]
+    if len(set(names)) != len(names):
+        parser.error("session names must be unique")
+    if args.link and args.link not in names:
+        parser.error(f"unknown session for --link: {args.link}")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        ableton_link = None
+        if args.link:
+            from AbletonLink import AbletonLink
+            ableton_link = AbletonLink()
+
+        pattern_store = PatternStore(PathUtils.get_patterns_dir(), FRAME_RATE)
+        sessions = []
+        for name, index in devices:
+            path = os.path.join(args.output_dir, f"{name}.jsonl") if args.output_dir else None
+            sessions.append(Session(name, index, pattern_store, SessionOutput(name, path, results),
+                                    ableton_link if name == args.link else None, FRAME_RATE,
+                                    range_key, args.engine, args.onsets, args.incremental, args.block, args.hop,
+                                    args.window, not args.no_native, args.channels or None, args.target_latency,
+                                    args.process))
+
+        manager = SessionManager(sessions, args.workers)
+        try:
+            manager.start()
+            manager.stopping.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            manager.stop()
+            for session in sessions:
+                session.close()
+            if ableton_link:
+                ableton_link.close()
+
+
+if __name__ == "__main__":
+    main()
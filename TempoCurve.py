@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class TempoCurve:
+    """Pattern search of many overlapping windows of one long signal at once.
+
+    Searching window after window repeats most of the work: overlapping
+    windows share most of their beat events. Here the loudest sample of
+    every half second is found once for the whole signal, and each window
+    (starting on a half second) takes the events of its half seconds, plus
+    the loudest sample of its tail when its length is not a whole number
+    of half seconds, exactly like search_beat_events of the window. With
+    the onset front end the thresholds depend on the window, so each
+    window is detected on its own.
+
+    The votes of a batch of windows are then counted by one
+    BpmPattern.window_votes call for the coarse pattern and one per range
+    for the fine windows, and each window is judged like
+    BpmAnalyzer.search_bpm_votes judges a buffer: the tempos are the same
+    as searching each window. Voting costs the same per beat event either
+    way, so the gain is the shared events and the fewer calls: about 2x
+    over search_bpm per window, 1.4x with onsets (benchmarks/curve.py).
+    """
+    def __init__(self, analyzer, batch_events: int = 128):
+        self.analyzer = analyzer
+        self.step_size = analyzer.frame_rate // 2
+        # Windows are voted together until they hold about this many beat
+        # events, which keeps the temporary arrays of a batch in cache, and
+        # at most batch_windows (the coarse votes take about 1 MB a window)
+        self.batch_events = batch_events
+        self.batch_windows = 16
+
+    def estimate(self, signal_array: np.ndarray, starts: np.ndarray, window: int) -> tuple:
+        """(bpm, confidence) arrays of the windows starting at starts, 0 where there is no tempo."""
+        bpm = np.zeros(len(starts))
+        confidence = np.zeros(len(starts))
+        events, windows, weights = self.beat_events(signal_array, starts, window)
+        # Events are in window order: each batch is a slice of them
+        bounds = np.searchsorted(windows, np.arange(len(starts) + 1))
+        first = 0
+        while first < len(starts):
+            last = max(int(np.searchsorted(bounds, bounds[first] + self.batch_events, side="right")) - 1, first + 1)
+            last = min(last, first + self.batch_windows)
+            batch = slice(bounds[first], bounds[last])
+            bpm[first:last], confidence[first:last] = self.search(
+                events[batch], windows[batch] - first, None if weights is None else weights[batch], last - first
+            )
+            first = last
+        return bpm, confidence
+
+    def beat_events(self, signal_array: np.ndarray, starts: np.ndarray, window: int) -> tuple:
+        """Beat events of every window relative to its start, their window and weights (None when unweighted)."""
+        analyzer = self.analyzer
+        with analyzer.instrumentation.stage("beat_events"):
+            if analyzer.onset_detector:
+                detected = [analyzer.onset_detector.detect(signal_array[start:start + window]) for start in starts]
+                windows = np.repeat(np.arange(len(starts)), [len(events) for events, _ in detected])
+                return (np.concatenate([events for events, _ in detected] or [np.zeros(0, dtype=np.int64)]), windows,
+                        np.concatenate([weights for _, weights in detected] or [np.zeros(0)]))
+            full = window // self.step_size
+            loudest = analyzer.search_beat_events(signal_array[:len(signal_array) // self.step_size * self.step_size],
+                                                  analyzer.frame_rate)
+            events = loudest[starts[:, None] // self.step_size + np.arange(full)] - starts[:, None]
+            tail = window - full * self.step_size
+            if tail:
+                tails = signal_array[(starts + full * self.step_size)[:, None] + np.arange(tail)]
+                events = np.hstack((events, analyzer._loudest(tails)[:, None] + full * self.step_size))
+            return events.ravel(), np.repeat(np.arange(len(starts)), events.shape[1]), None
+
+    @staticmethod
+    def peaks(counts: np.ndarray) -> tuple:
+        """Step of the peak of every row of vote counts, and whether search_bpm_votes accepts it.
+
+        Same tests as finalise_bpm_container and check_bpm_wrapped, which
+        compares the counts with the index of the peak.
+        """
+        step = counts.argmax(axis=1)
+        peak = counts[np.arange(len(counts)), step]
+        ambiguous = np.count_nonzero(counts == step[:, None], axis=1) > 1
+        return step, counts.all(axis=1) & ~ambiguous & (peak >= 6)
+
+    def search(self, events: np.ndarray, windows: np.ndarray, weights: np.ndarray, count: int) -> tuple:
+        """search_bpm_votes of count windows: (bpm, confidence) arrays.
+
+        The confidence is the share of a window's beat events (by weight)
+        that the winning fine (tempo step, offset) explains.
+        """
+        analyzer = self.analyzer
+        stats = analyzer.instrumentation
+        coarse_steps = analyzer.ranges[-1][1] + analyzer.coarse_steps
+        with stats.stage("coarse"):
+            steps = min(coarse_steps, len(analyzer.bpm_pattern))
+            votes = analyzer.bpm_pattern.window_votes(events, windows, count, np.zeros(count, dtype=np.int64),
+                                                      steps, weights=weights)
+            if steps < coarse_steps:
+                # Like bpm_container, steps beyond the pattern have no votes
+                votes = np.pad(votes, ((0, 0), (0, coarse_steps - steps), (0, 0)))
+            counts = votes[:, :, 1:].max(axis=2)
+
+        # Winner of each range, then in auto mode the range to refine
+        candidates = [[] for _ in range(count)]
+        for start_bpm, first_step, bpm_pattern_fine in analyzer.ranges:
+            wrapped, accepted = self.peaks(counts[:, first_step:first_step + analyzer.coarse_steps])
+            for w in np.flatnonzero(accepted):
+                step = first_step + int(wrapped[w])
+                offset = int(np.argmax(votes[w, step, 1:])) + 1
+                candidates[w].append((int(analyzer.bpm_pattern.periods[step]), offset, start_bpm,
+                                      bpm_pattern_fine, wrapped[w]))
+        for w in range(count):
+            if len(candidates[w]) > 1:
+                mine = windows == w
+                candidates[w] = analyzer.slowest_explaining(candidates[w], events[mine],
+                                                            None if weights is None else weights[mine])
+
+        bpm = np.zeros(count)
+        confidence = np.zeros(count)
+        totals = np.bincount(windows, weights, minlength=count)
+        for start_bpm, _, bpm_pattern_fine in analyzer.ranges:
+            chosen = np.array([w for w in range(count) if candidates[w] and candidates[w][0][2] == start_bpm],
+                              dtype=np.int64)
+            if not chosen.size:
+                continue
+            wrapped = np.array([candidates[w][0][4] for w in chosen])
+            # get_bpm_pattern_fine_window; windows reaching outside the fine
+            # pattern have steps without votes, which gives no tempo
+            fine_starts = ((wrapped / 4) / 0.05 - 20).astype(np.int64)
+            inside = (fine_starts >= 0) & (fine_starts + 40 <= len(bpm_pattern_fine))
+            chosen, wrapped, fine_starts = chosen[inside], wrapped[inside], fine_starts[inside]
+            renumber = np.full(count, -1)
+            renumber[chosen] = np.arange(len(chosen))
+            mine = renumber[windows] >= 0
+            with stats.stage("fine"):
+                fine_votes = bpm_pattern_fine.window_votes(
+                    events[mine], renumber[windows[mine]], len(chosen), fine_starts, 40,
+                    weights=None if weights is None else weights[mine],
+                )
+                fine_counts = fine_votes[:, :, 1:].max(axis=2)
+            fine_wrapped, accepted = self.peaks(fine_counts)
+            for i in np.flatnonzero(accepted):
+                w = chosen[i]
+                bpm[w] = analyzer.bpm_wrapped_to_float_str(((wrapped[i],),), ((fine_wrapped[i],),), start_bpm)[0]
+                confidence[w] = fine_counts[i, fine_wrapped[i]] / totals[w]
+        return bpm, confidence
@@ -0,0 +1,131 @@
+import numpy as np
+from scipy import fft
+from OnsetDetector import OnsetDetector
+from TempoCurve import TempoCurve
+from AnalysisOptions import PATTERN_ENGINE, AUTOCORRELATION_ENGINE
+
+
+class TempoEstimator:
+    """Interface of a tempo engine used by BpmAnalyzer.
+
+    set_ranges() receives the (start BPM, width) ranges to search, in
+    ascending order; estimate() returns (bpm_float, bpm_str) for a
+    band-passed buffer, or 0 when the buffer gives no confident tempo.
+    """
+    name = None
+    # Whether the engine searches pattern tables, which BpmAnalyzer maps
+    uses_patterns = False
+
+    def set_ranges(self, ranges: list) -> None:
+        raise NotImplementedError
+
+    def estimate(self, signal_array: np.ndarray) -> tuple:
+        raise NotImplementedError
+
+    def estimate_curve(self, signal_array: np.ndarray, starts: np.ndarray, window: int) -> tuple:
+        """(bpm, confidence) arrays of the windows of signal_array starting at starts, 0 bpm where none.
+
+        This default estimates window after window and has no confidence
+        (NaN); engines override it to share work between windows.
+        """
+        bpm = np.array([(self.estimate(signal_array[start:start + window]) or (0,))[0] for start in starts],
+                       dtype=np.float64)
+        return bpm, np.full(len(starts), np.nan)
+
+    def nbytes(self) -> int:
+        """Memory held for the search, excluding the buffer."""
+        return 0
+
+
+class PatternEstimator(TempoEstimator):
+    """The pattern-matching search of BpmAnalyzer: coarse then fine votes over the tables."""
+    name = PATTERN_ENGINE
+    uses_patterns = True
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def set_ranges(self, ranges: list) -> None:
+        # The analyzer maps the patterns of the ranges itself
+        pass
+
+    def estimate(self, signal_array: np.ndarray) -> tuple:
+        return self.analyzer.search_bpm_patterns(signal_array)
+
+    def estimate_curve(self, signal_array: np.ndarray, starts: np.ndarray, window: int) -> tuple:
+        return TempoCurve(self.analyzer).estimate(signal_array, starts, window)
+
+    def nbytes(self) -> int:
+        return self.analyzer.pattern_store.nbytes()
+
+
+class AutocorrelationEstimator(TempoEstimator):
+    """Tempo from the autocorrelation of the onset strength envelope, without pattern tables.
+
+    The onset strength of OnsetDetector (about 441 values per second) is
+    autocorrelated with one FFT, O(n log n). Every tempo of a 0.05 BPM grid
+    is scored by a comb over the first `harmonics` multiples of its beat
+    period, read from the autocorrelation by linear interpolation, so that
+    the longer lags refine the precision of the shorter ones. The
+    autocorrelation is not normalised by the overlap: it fades with the lag,
+    which favours the beat over its multiples.
+
+    In auto mode each range's best tempo is a candidate. Half the tempo
+    scores nearly as well as the tempo (its comb hits every other beat at
+    longer, faded lags) while double the tempo scores about half, so the
+    fastest candidate scoring at least `margin` times the best is kept. A
+    best score below `min_score` (in units of the envelope energy) gives
+    no estimate.
+    """
+    name = AUTOCORRELATION_ENGINE
+
+    def __init__(self, frame_rate: int = 11025, onset_detector: OnsetDetector = None, step_bpm: float = 0.05,
+                 harmonics: int = 8, margin: float = 0.85, min_score: float = 0.03):
+        self.onset_detector = onset_detector or OnsetDetector(frame_rate)
+        self.step_bpm = step_bpm
+        self.harmonics = harmonics
+        self.margin = margin
+        self.min_score = min_score
+        self.set_ranges([(60, 100)])
+
+    def set_ranges(self, ranges: list) -> None:
+        # Same span as the pattern search: start_bpm - 10 to start_bpm + width
+        self.grids = [np.arange(start_bpm - 10 + self.step_bpm, start_bpm + width + self.step_bpm / 2, self.step_bpm)
+                      for start_bpm, width in ranges]
+        self.lags = [60 * self.onset_detector.envelope_rate / grid for grid in self.grids]
+
+    def autocorrelation(self, signal_array: np.ndarray) -> np.ndarray:
+        """Autocorrelation of the mean-removed onset strength, 1 at lag 0 (empty if silent)."""
+        envelope = self.onset_detector.envelope(signal_array)
+        if len(envelope) < 2:
+            return np.zeros(0)
+        strength = self.onset_detector.strength(envelope).astype(np.float64)
+        strength -= strength.mean()
+        n = len(strength)
+        spectrum = fft.rfft(strength, fft.next_fast_len(2 * n, real=True))
+        autocorrelation = fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2)[:n]
+        if autocorrelation[0] <= 0:
+            return np.zeros(0)
+        return autocorrelation / autocorrelation[0]
+
+    def scores(self, autocorrelation: np.ndarray, lags: np.ndarray) -> np.ndarray:
+        """Comb score of every lag; multiples beyond the buffer count as 0."""
+        multiples = lags[:, None] * np.arange(1, self.harmonics + 1)[None, :]
+        values = np.interp(multiples, np.arange(len(autocorrelation)), autocorrelation, right=0)
+        return values.mean(axis=1)
+
+    def estimate(self, signal_array: np.ndarray) -> tuple:
+        autocorrelation = self.autocorrelation(signal_array)
+        if not autocorrelation.size:
+            return 0
+        candidates = []
+        for grid, lags in zip(self.grids, self.lags):
+            scores = self.scores(autocorrelation, lags)
+            best = int(np.argmax(scores))
+            candidates.append((scores[best], grid[best]))
+        best_score = max(score for score, _ in candidates)
+        if best_score < self.min_score:
+            return 0
+        bpm = max(bpm for score, bpm in candidates if score >= best_score * self.margin)
+        bpm_float = round(float(bpm), 2)
+        return bpm_float, format(bpm_float, ".2f")
@@ -0,0 +1,162 @@
+"""
+Live view of the pattern votes: a histogram of the latest search over the
+tempos, above a scrolling tempogram of the past ones
+
+A second peak at half or double the tempo, or a tempogram with two bright
+lines, shows an ambiguous beat at a glance. The analyzer hands VoteHistogram
+snapshots over from its thread (see BpmAnalyzer.add_histogram_output); they
+are drawn by the Tk thread in frames. Canvas items are made once per range
+and only moved afterwards, and the tempogram is one PhotoImage rewritten
+from a numpy array, so a frame costs a few milliseconds whatever the
+history. A frame that overruns its budget delays the next one, which keeps
+drawing to a bounded share of the time the analyzer and the audio callback
+compete with for the interpreter lock.
+"""
+
+import base64
+import tkinter as tk
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+from Instrumentation import DISABLED
+
+BACKGROUND = (255, 255, 255)
+FOREGROUND = (26, 115, 232)  # The BPM display's blue
+# Tempos between tick labels under the histogram, in BPM
+TICK_BPM = 20
+
+
+def tempogram_ppm(history: np.ndarray, newest: int, width: int, height: int) -> bytes:
+    """Binary PPM of a (bars, columns) ring of normalized votes, oldest column left, slowest tempo at the bottom.
+
+    newest is the ring index of the newest column. Bars and columns are
+    stretched to width x height pixels, nearest neighbour.
+    """
+    bars, columns = history.shape
+    order = (newest + 1 + np.arange(columns)) % columns
+    rows = bars - 1 - np.arange(height) * bars // height
+    cols = order[np.arange(width) * columns // width]
+    level = history[rows[:, None], cols[None, :], None]
+    background = np.array(BACKGROUND, dtype=np.float32)
+    pixels = (background + (np.array(FOREGROUND, dtype=np.float32) - background) * level).astype(np.uint8)
+    return b"P6 %d %d 255\n" % (width, height) + pixels.tobytes()
+
+
+class TempoView:
+    """Vote histogram and tempogram canvases in a Tk frame, drawn every frame_ms at most.
+
+    snapshots is a deque the analyzer thread appends VoteHistogram to; each
+    frame takes what arrived since the previous one, every snapshot being a
+    column of the tempogram. Drawing takes at most budget of the Tk thread's
+    time: a frame that took longer pushes the next one back.
+    """
+    def __init__(self, parent, snapshots: deque, width: int = 715, histogram_height: int = 70,
+                 tempogram_height: int = 90, columns: int = 120, frame_ms: int = 100, budget: float = 0.1,
+                 instrumentation=DISABLED):
+        self.snapshots = snapshots
+        self.width = width
+        self.histogram_height = histogram_height
+        self.tempogram_height = tempogram_height
+        self.columns = columns
+        self.frame_ms = frame_ms
+        self.budget = budget
+        self.instrumentation = instrumentation
+
+        self.histogram = tk.Canvas(parent, width=width, height=histogram_height + 14, bg="white",
+                                   highlightthickness=0)
+        self.histogram.pack(fill=tk.X)
+        self.tempogram = tk.Canvas(parent, width=width, height=tempogram_height, bg="white", highlightthickness=0)
+        self.tempogram.pack(fill=tk.X, pady=(2, 0))
+        self.image = tk.PhotoImage(width=width, height=tempogram_height)
+        self.tempogram.create_image(0, 0, image=self.image, anchor=tk.NW)
+
+        # Items of the current range, made by _layout
+        self.layout = None
+        self.bars = []
+        self.ticks = []
+        self.tops = None
+        self.history = None
+        self.newest = -1
+        # Estimate, half and double of it: where a wrong multiple would show
+        self.markers = [self.histogram.create_line(0, 0, 0, 0, fill=fill, dash=dash, state=tk.HIDDEN)
+                        for fill, dash in (("#d93025", ()), ("gray", (2, 2)), ("gray", (2, 2)))]
+        self.bpm = None
+        self.marked = None
+        self.histogram.after(frame_ms, self._frame)
+
+    def set_bpm(self, bpm: float = None) -> None:
+        """Mark the displayed estimate on the histogram from the next frame (Tk thread)."""
+        self.bpm = bpm
+
+    def _frame(self) -> None:
+        started = perf_counter()
+        latest = None
+        while self.snapshots:
+            latest = self.snapshots.popleft()
+            self._add_column(latest)
+        if latest is not None:
+            self._draw_histogram(latest)
+            ppm = tempogram_ppm(self.history, self.newest, self.width, self.tempogram_height)
+            self.image.configure(data=base64.b64encode(ppm).decode("ascii"), format="ppm")
+        if self.bpm != self.marked or latest is not None:
+            self._draw_markers()
+        spent = perf_counter() - started
+        if latest is not None:
+            self.instrumentation.record("ui_frame", spent)
+        self.histogram.after(max(self.frame_ms, int(spent / self.budget * 1000)), self._frame)
+
+    def _x(self, bpm: float) -> float:
+        first_bpm, step_bpm, bars = self.layout
+        return (bpm - first_bpm) / (step_bpm * bars) * self.width
+
+    def _layout(self, layout: tuple) -> None:
+        """Make the bars and tick labels of a new range, and start a new tempogram."""
+        for item in self.bars + self.ticks:
+            self.histogram.delete(item)
+        self.layout = layout
+        first_bpm, step_bpm, bars = layout
+        bar_width = self.width / bars
+        bottom = self.histogram_height
+        self.bars = [self.histogram.create_rectangle(i * bar_width, bottom, (i + 1) * bar_width, bottom,
+                                                     fill="#1a73e8", width=0)
+                     for i in range(bars)]
+        first_tick = -(-first_bpm // TICK_BPM) * TICK_BPM
+        self.ticks = [self.histogram.create_text(self._x(bpm), bottom + 2, text=f"{bpm:g}", anchor=tk.N,
+                                                 font=("Helvetica", 8), fill="gray")
+                      for bpm in np.arange(first_tick, first_bpm + step_bpm * bars, TICK_BPM)]
+        self.tops = np.full(bars, bottom)
+        self.history = np.zeros((bars, self.columns), dtype=np.float32)
+        self.newest = -1
+        for marker in self.markers:
+            self.histogram.tag_raise(marker)
+        self.marked = None
+
+    def _add_column(self, snapshot) -> None:
+        layout = (snapshot.first_bpm, snapshot.step_bpm, len(snapshot.votes))
+        if layout != self.layout:
+            self._layout(layout)
+        peak = snapshot.votes.max()
+        self.newest = (self.newest + 1) % self.columns
+        self.history[:, self.newest] = snapshot.votes / peak if peak > 0 else 0
+
+    def _draw_histogram(self, snapshot) -> None:
+        """Move the bars whose height changed."""
+        peak = snapshot.votes.max()
+        heights = snapshot.votes / peak if peak > 0 else np.zeros(len(snapshot.votes))
+        tops = (self.histogram_height * (1 - heights)).astype(int)
+        bar_width = self.width / len(self.bars)
+        for i in np.flatnonzero(tops != self.tops):
+            self.histogram.coords(self.bars[i], i * bar_width, tops[i], (i + 1) * bar_width, self.histogram_height)
+        self.tops = tops
+
+    def _draw_markers(self) -> None:
+        self.marked = self.bpm
+        for marker, factor in zip(self.markers, (1, 0.5, 2)):
+            x = self._x(self.bpm * factor) if self.bpm and self.layout else -1
+            if 0 <= x <= self.width:
+                self.histogram.coords(marker, x, 0, x, self.histogram_height)
+                self.histogram.itemconfigure(marker, state=tk.NORMAL)
+            else:
+                self.histogram.itemconfigure(marker, state=tk.HIDDEN)
@@ -2,28 +2,16 @@
 
 import tkinter as tk
 from tkinter import ttk
-import pyaudio
 import queue
+import threading
+import traceback
 from collections import deque
+from AnalysisOptions import BPM_RANGES, AUTO_RANGE, TEMPO_ENGINES, parse_range
+from Instrumentation import DISABLED
 
 
 FRAME_RATE = 11025
 
-# Predefined BPM range options
-BPM_RANGES = {
-    "60–160": (60, 100),
-    "130–230": (130, 100),
-    "210–300": (210, 90),
-}
-
-class BpmStorage:
-    """Storage for BPM values."""
-    def __init__(self):
-        self._float = 120.00  # default
-        self._str = "***.**"  # default
-        self.average_window = deque(maxlen=3)
-             
-
 class UserInterface:
     """Main UI for BPM analyzer with Tk."""
 
@@ -32,7 +20,7 @@ class UserInterface:
         self.module = module
         self.root = tk.Tk()
         self.root.title("Ableton Link BPM Analyzer")
-        self.root.geometry("735x260")
+        self.root.geometry("735x280")
         
 
         header = tk.Frame(self.root, padx=10, pady=6)
@@ -59,9 +47,18 @@ class UserInterface:
         range_frame.pack(fill=tk.X, pady=(0, 8))
         tk.Label(range_frame, text="BPM Range:").pack(side=tk.LEFT)
         self.range_var = tk.StringVar(value="60–160")
-        self.range_combobox = ttk.Combobox(range_frame, textvariable=self.range_var, values=list(BPM_RANGES.keys()), state="readonly", width=20)
+        self.range_combobox = ttk.Combobox(range_frame, textvariable=self.range_var, values=list(BPM_RANGES.keys()) + [AUTO_RANGE], width=20)
         self.range_combobox.pack(side=tk.LEFT, padx=(6, 6))
         self.range_combobox.bind("<<ComboboxSelected>>", self.on_range_change)
+        # A custom range like 85-95 can be typed in and applied with Return
+        self.range_combobox.bind("<Return>", self.on_range_change)
+
+        # Tempo engine selector
+        tk.Label(range_frame, text="Engine:").pack(side=tk.LEFT, padx=(12, 0))
+        self.engine_var = tk.StringVar(value=self.module.tempo_engine)
+        self.engine_combobox = ttk.Combobox(range_frame, textvariable=self.engine_var, values=TEMPO_ENGINES, state="readonly", width=16)
+        self.engine_combobox.pack(side=tk.LEFT, padx=(6, 6))
+        self.engine_combobox.bind("<<ComboboxSelected>>", self.on_engine_change)
      
 
         # Activate button
@@ -72,7 +69,8 @@ class UserInterface:
         button_frame = tk.Frame(frame)
         button_frame.pack(pady=(6, 6))
         
-        self.activate_btn = tk.Button(button_frame, text="Activate", command=self.toggle_activate, width=12)
+        # Enabled once the analyzer and the selected range are ready
+        self.activate_btn = tk.Button(button_frame, text="Activate", command=self.toggle_activate, width=12, state=tk.DISABLED)
         self.activate_btn.pack()
         
         # Ableton Link client count display (below button)
@@ -80,10 +78,30 @@ class UserInterface:
         self.ableton_clients_label = tk.Label(button_frame, textvariable=self.ableton_clients_var, font=("Helvetica", 10, "bold"), fg="#4285F4")
         self.ableton_clients_label.pack(pady=(4, 0))
 
+        # Startup and range preparation progress
+        self.status_var = tk.StringVar(value="Loading analyzer...")
+        tk.Label(button_frame, textvariable=self.status_var, font=("Helvetica", 9), fg="gray").pack(pady=(2, 0))
+
+        # Vote histogram and tempogram (see TempoView), built once the
+        # analyzer is loaded: it needs numpy, which would delay the window
+        self.tempo_frame = tk.Frame(frame)
+        self.tempo_frame.pack(fill=tk.X)
+        self.tempo_view = None
+        # Appended by the analyzer thread, drained by the view's frames
+        self._histograms = deque(maxlen=16)
+
         self.orig_bg = self.activate_btn.cget("bg")
         self.orig_fg = self.activate_btn.cget("fg")
 
         self.refresh_devices()
+        # Ranges and engines are prepared off the Tk thread, one at a time;
+        # only the latest selection is applied.
+        self._prepare_lock = threading.Lock()
+        self._preparing = 0  # Only changed in the Tk thread
+        self._prepared = queue.Queue()
+        self._devices_loaded = False
+        self._analyzer_seen = False
+        self.root.after(50, self._check_startup)
         # Queue for thread-safe BPM updates from analyzer threads.
         self._bpm_queue = queue.Queue()
         # Flag to prevent BPM enqueueing during shutdown
@@ -95,6 +113,7 @@ class UserInterface:
 
     def get_audio_devices(self):
         try:
+            import pyaudio
             p = pyaudio.PyAudio()
         except Exception:
             return []
@@ -113,7 +132,10 @@ class UserInterface:
         # Use AudioStreamer to get device names and indices to avoid
         # passing a string device name later to PyAudio (which expects an
         # integer index). AudioStreamer.available_audio_devices() returns
-        # [names, indices].
+        # [names, indices]. It is created in the background at startup;
+        # _check_startup refreshes the list once it is up.
+        if self.module.audio_streamer is None:
+            return
         try:
             devices, indices = self.module.audio_streamer.available_audio_devices()
         except Exception:
@@ -140,6 +162,11 @@ class UserInterface:
             # If queueing fails, ignore — UI shouldn't crash because of analyzer
             pass
 
+    def set_histogram(self, histogram):
+        """Thread-safe entry point for the vote histogram of every search; drawn by TempoView."""
+        if self._accepting_bpm:
+            self._histograms.append(histogram)
+
     def _process_bpm_queue(self):
         """Process BPM updates in Tk mainloop and display on UI."""
         updated = False
@@ -152,6 +179,8 @@ class UserInterface:
                     else:
                         v = float(value)
                         self.bpm_var.set(f"{v:.2f}")
+                    if self.tempo_view:
+                        self.tempo_view.set_bpm(None if value is None else float(value))
                     updated = True
                 except Exception:
                     self.bpm_var.set("***.**")
@@ -180,11 +209,79 @@ class UserInterface:
         # schedule next update
         self.root.after(500, self._update_ableton_link_clients)
 
+    def _check_startup(self):
+        """Follow the background startup: fill the devices, then enable Activate."""
+        if self.module.load_error:
+            print(f"❌ Closing: {self.module.load_error}")
+            self.root.destroy()
+            return
+        if not self._devices_loaded and self.module.audio_streamer is not None:
+            self._devices_loaded = True
+            self.refresh_devices()
+        if not self._analyzer_seen and self.module.bpm_analyzer is not None:
+            self._analyzer_seen = True
+            if getattr(self.module, "show_tempo_view", False):
+                self._build_tempo_view()
+            # Apply what was selected while the analyzer was loading
+            if self.engine_var.get() != self.module.bpm_analyzer.engine:
+                self.on_engine_change()
+            if self.range_var.get() != self.module.bpm_analyzer.range_key:
+                self.on_range_change()
+        self._update_activate_state()
+        if not (self._devices_loaded and self._analyzer_seen):
+            self.root.after(50, self._check_startup)
+
+    def _build_tempo_view(self):
+        from TempoView import TempoView
+        self.root.geometry("735x480")
+        self.tempo_view = TempoView(self.tempo_frame, self._histograms,
+                                    instrumentation=getattr(self.module, "instrumentation", DISABLED))
+
+    def _update_activate_state(self):
+        ready = self.module.bpm_analyzer is not None and not self._preparing
+        if ready:
+            self.status_var.set("")
+        elif self.module.bpm_analyzer is not None:
+            self.status_var.set("Preparing range...")
+        if not self.is_active:
+            self.activate_btn.config(state=tk.NORMAL if ready else tk.DISABLED)
+
+    def _prepare(self, selection, apply):
+        """Run apply() in the background if selection is still current, then update Activate."""
+        def run():
+            try:
+                with self._prepare_lock:
+                    if selection():
+                        apply()
+            except Exception as e:
+                print(f"❌ Error preparing analyzer: {e}")
+                traceback.print_exc()
+            finally:
+                self._prepared.put(selection)
+        self._preparing += 1
+        self._update_activate_state()
+        threading.Thread(target=run, daemon=True).start()
+        if self._preparing == 1:
+            # No poll running yet
+            self.root.after(50, self._poll_prepared)
+
+    def _poll_prepared(self):
+        while not self._prepared.empty():
+            self._prepared.get_nowait()
+            self._preparing -= 1
+        self._update_activate_state()
+        if self._preparing:
+            self.root.after(50, self._poll_prepared)
+
     def toggle_activate(self):
+        if self.module.bpm_analyzer is None:
+            return
         if not self.is_active:
             self.is_active = True
             self._accepting_bpm = True  # Enable BPM updates
             self.activate_btn.config(text="Deactivate", bg=self.orig_bg, fg=self.orig_fg)
+            if hasattr(self.module, "startup_mark"):
+                self.module.startup_mark("activated")
             # Use the integer device index mapped by refresh_devices()
             idx = self.get_selected_device_index()
             
@@ -198,6 +295,7 @@ class UserInterface:
                     self._bpm_queue.get_nowait()
             except Exception:
                 pass
+            self._histograms.clear()
             
             self.module.bpm_analyzer.stop_run_analyzer_thread()
             if self.after_id:
@@ -208,6 +306,7 @@ class UserInterface:
                 self.after_id = None
 
             self.activate_btn.config(text="Activate", bg=self.orig_bg, fg=self.orig_fg)
+            self._update_activate_state()
 
             # Reset BPM and client count display
             self.set_bpm(None)
@@ -239,11 +338,31 @@ class UserInterface:
             return None
 
     def on_range_change(self, event=None):
-        """Handle BPM range change from combobox."""
-        range_name = self.range_var.get()
-        if range_name in BPM_RANGES:
+        """Handle BPM range change from combobox.
+
+        Patterns may have to be generated, so the range is prepared in the
+        background; Activate is enabled again once it is ready.
+        """
+        range_name = parse_range(self.range_var.get())
+        if range_name is not None:
+            self.range_var.set(range_name)
             print(f"Selected BPM range: {range_name}")
-            self.module.bpm_analyzer.change_bpm_pattern(range_name)
+            self.selected_range = range_name
+            if self.module.bpm_analyzer is not None:
+                self._prepare(lambda: self.selected_range == range_name,
+                              lambda: self.module.bpm_analyzer.change_bpm_pattern(range_name))
+        else:
+            print(f"Unknown BPM range: {self.range_var.get()}")
+
+    def on_engine_change(self, event=None):
+        """Handle tempo engine change from combobox, prepared in the background like ranges."""
+        engine = self.engine_var.get()
+        if engine in TEMPO_ENGINES:
+            print(f"Selected tempo engine: {engine}")
+            self.selected_engine = engine
+            if self.module.bpm_analyzer is not None:
+                self._prepare(lambda: self.selected_engine == engine,
+                              lambda: self.module.bpm_analyzer.change_engine(engine))
         else:
-            print(f"Unknown BPM range: {range_name}")
+            print(f"Unknown tempo engine: {engine}")
 
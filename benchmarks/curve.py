@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tempo curve of a long signal: search_bpm window after window against the
+batched BpmAnalyzer.search_bpm_curve
+
+The synthetic set plays several tempos in a row. Both methods analyze the
+same windows; the script checks they find the same tempos and prints the
+time of each.
+
+Usage:
+    python3 benchmarks/curve.py
+    python3 benchmarks/curve.py --minutes 10 --hop 0.5 --range auto --onsets
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from AnalysisOptions import TEMPO_ENGINES, parse_range
+from BandpassFilter import bandpass_filter
+from BpmAnalizer import BpmAnalyzer
+from signals import drum_track
+
+FRAME_RATE = 11025
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-window search against the batched tempo curve")
+    parser.add_argument("--minutes", type=float, default=3, help="Length of the synthetic set")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--hop", type=float, default=1, help="Hop between windows in seconds")
+    parser.add_argument("--range", default="60–160", help="BPM range, custom range or auto")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset envelope front end")
+    args = parser.parse_args()
+
+    tempos = [92, 128.4, 174, 141, 100]
+    part = args.minutes * 60 / len(tempos)
+    signal_array = bandpass_filter(np.concatenate([drum_track(bpm, FRAME_RATE, part) for bpm in tempos]), FRAME_RATE)
+    analyzer = BpmAnalyzer(None, FRAME_RATE, onsets=args.onsets, engine=args.engine)
+    analyzer.change_bpm_pattern(parse_range(args.range))
+
+    started = perf_counter()
+    times, bpm, confidence = analyzer.search_bpm_curve(signal_array, args.window, args.hop)
+    batched = perf_counter() - started
+
+    # The same windows, one search_bpm call each
+    window = min(int(args.window * FRAME_RATE), len(signal_array))
+    starts = (times * FRAME_RATE - window / 2).round().astype(int)
+    started = perf_counter()
+    looped = np.array([(analyzer.search_bpm(signal_array[start:start + window]) or (0,))[0] for start in starts])
+    per_window = perf_counter() - started
+
+    differences = int(np.count_nonzero(looped != bpm))
+    confident = confidence[(bpm > 0) & ~np.isnan(confidence)]
+    print(f"{len(times)} windows of {args.window:g} s, {np.count_nonzero(bpm)} with a tempo"
+          + (f", mean confidence {confident.mean():.2f}" if confident.size else ""))
+    print(f"search_bpm per window  {per_window * 1000:9.1f} ms ({per_window / len(times) * 1000:.3f} ms a window)")
+    print(f"search_bpm_curve       {batched * 1000:9.1f} ms ({batched / len(times) * 1000:.3f} ms a window), "
+          f"{per_window / batched:.1f}x")
+    print(("✅ Same tempos" if not differences else f"❌ {differences} windows differ"))
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
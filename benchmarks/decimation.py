@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Cost of native-rate capture: downmix and polyphase decimation to the
+analysis rate, as done in the audio callback
+
+For common interface rates and channel counts, times callbacks of --block
+samples at the analysis rate and prints the cost per input sample (one
+channel of one frame) and the share of the callback's audio time it takes;
+the script fails when a share exceeds --max-share. It also checks that
+decimating block by block gives the whole-signal result and that a drum
+track captured at 48 kHz stereo gets the same tempo as one generated at the
+analysis rate.
+
+Usage:
+    python3 benchmarks/decimation.py
+    python3 benchmarks/decimation.py --block 512 --max-share 0.05
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from BandpassFilter import bandpass_filter
+from BpmAnalizer import BpmAnalyzer
+from Decimator import StreamingDecimator, downmix
+from signals import drum_track, to_int16
+
+FRAME_RATE = 11025
+RATES = [22050, 44100, 48000, 88200, 96000, 192000]
+CHANNELS = [1, 2, 8]
+
+
+def callback_cost(rate: int, channels: int, block: int, seconds: float) -> tuple:
+    """Mean seconds per callback and input frames per callback, over seconds of noise."""
+    decimator = StreamingDecimator(rate, FRAME_RATE)
+    frames = max(block * decimator.down // decimator.up, 1)
+    rng = np.random.default_rng(0)
+    noise = rng.integers(-3000, 3000, frames * channels * 8).astype(np.int16)
+    calls = max(int(seconds * rate / frames), 8)
+    started = perf_counter()
+    for call in range(calls):
+        start = call % 8 * frames * channels
+        decimator.process(downmix(noise[start:start + frames * channels], channels))
+    return (perf_counter() - started) / calls, frames
+
+
+def streaming_matches(rate: int) -> float:
+    """Largest difference between random-sized blocks and upfirdn over the whole signal."""
+    decimator = StreamingDecimator(rate, FRAME_RATE)
+    rng = np.random.default_rng(1)
+    samples = rng.normal(0, 3000, rate * 2).astype(np.int16)
+    blocks, start = [], 0
+    while start < len(samples):
+        size = int(rng.integers(1, 4096))
+        blocks.append(decimator.process(samples[start:start + size]))
+        start += size
+    streamed = np.concatenate(blocks)
+    whole = signal.upfirdn(decimator.filter, samples.astype(np.float64), decimator.up, decimator.down)
+    return float(np.abs(streamed - np.clip(np.rint(whole[:len(streamed)]), -32768, 32767)).max())
+
+
+def tempo_check(bpm: float, rate: int = 48000) -> tuple:
+    """Tempo of a stereo drum track at rate decimated in blocks, and of the same track made at FRAME_RATE."""
+    left = drum_track(bpm, rate, 12).astype(np.float64)
+    stereo = to_int16(np.column_stack((left, np.roll(left, 7))).ravel() / 32767)
+    decimator = StreamingDecimator(rate, FRAME_RATE)
+    block = 2048 * 2
+    native = np.concatenate([decimator.process(downmix(stereo[start:start + block], 2))
+                             for start in range(0, len(stereo), block)])
+    analyzer = BpmAnalyzer(None, FRAME_RATE)
+    found = analyzer.search_bpm(bandpass_filter(native, FRAME_RATE))
+    direct = analyzer.search_bpm(bandpass_filter(drum_track(bpm, FRAME_RATE, 12), FRAME_RATE))
+    return (found or (0,))[0], (direct or (0,))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downmix and decimation cost per sample of native-rate capture")
+    parser.add_argument("--block", type=int, default=10240, help="Samples per callback at the analysis rate")
+    parser.add_argument("--seconds", type=float, default=20, help="Audio time simulated per format")
+    parser.add_argument("--max-share", type=float, default=0.05,
+                        help="Largest share of a callback's audio time the conversion may take")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'rate':>7} {'ch':>3} {'taps':>5} {'frames':>7} {'ns/sample':>10} {'ms/call':>8} {'share':>7}")
+    for rate in RATES:
+        taps = StreamingDecimator(rate, FRAME_RATE).taps
+        for channels in CHANNELS:
+            seconds, frames = callback_cost(rate, channels, args.block, args.seconds)
+            share = seconds / (frames / rate)
+            failed |= share > args.max_share
+            print(f"{rate:>7} {channels:>3} {taps:>5} {frames:>7} {seconds / (frames * channels) * 1e9:>10.1f} "
+                  f"{seconds * 1000:>8.3f} {share:>7.2%}" + (" ❌" if share > args.max_share else ""))
+
+    for rate in (44100, 48000, 96000):
+        difference = streaming_matches(rate)
+        failed |= difference > 1
+        print(("✅" if difference <= 1 else "❌") + f" {rate} Hz in blocks: at most {difference:g} LSB from upfirdn")
+    for bpm in (92, 128.4, 174):
+        found, direct = tempo_check(bpm)
+        close = abs(found - direct) <= 0.1
+        failed |= not close
+        print(("✅" if close else "❌") + f" {bpm} BPM: {found} from 48 kHz stereo, {direct} at {FRAME_RATE} Hz")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
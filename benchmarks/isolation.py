@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Capture and UI timer jitter with the analysis in a thread or in a worker process
+
+A capture thread writes a synthetic track into the filtered ring one block
+at a time, on the block clock like the PortAudio callback, and a UI thread
+ticks every 20 ms like Tk's after(). Both record how late they wake up
+while the analyzer runs back to back, first on a thread of the same
+process, then in a worker process reading the ring from shared memory.
+
+Usage:
+    python3 benchmarks/isolation.py
+    python3 benchmarks/isolation.py --auto --onsets --seconds 20
+"""
+
+import sys
+import argparse
+import threading
+from pathlib import Path
+from time import perf_counter, sleep
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from AnalysisProcess import ProcessAnalyzer, SharedRingReader
+from AnalysisOptions import AUTO_RANGE, TEMPO_ENGINES
+from BandpassFilter import bandpass_filter
+from BpmStorage import BpmStorage
+from RingBuffer import RingBuffer
+from signals import drum_track
+
+FRAME_RATE = 11025
+UI_TICK = 0.02
+
+
+class NoLink:
+    def enable(self, enabled: bool) -> None:
+        pass
+
+
+class Capture:
+    """AudioStreamer stand-in: writes the track into a shared ring on the block clock."""
+    def __init__(self, track: np.ndarray, block: int, hop: int, window: float):
+        self.track = track
+        self.block = block
+        self.hop = hop
+        self.filtered_buffer = RingBuffer.shared(int(window * FRAME_RATE), headroom=block)
+        self.lateness = []
+        self.running = False
+        self.thread = None
+
+    def start_stream(self, input_device_index=None) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop_stream(self) -> None:
+        self.running = False
+        self.thread.join()
+
+    def _run(self) -> None:
+        period = self.block / FRAME_RATE
+        started = perf_counter()
+        for i, start in enumerate(range(0, len(self.track) - self.block, self.block)):
+            if not self.running:
+                return
+            due = started + (i + 1) * period
+            sleep(max(due - perf_counter(), 0))
+            self.lateness.append(perf_counter() - due)
+            self.filtered_buffer.write(self.track[start:start + self.block])
+
+
+class Module:
+    def __init__(self, capture: Capture):
+        self.audio_streamer = capture
+        self.bpm_storage = BpmStorage()
+        self.ableton_link = NoLink()
+
+
+def ui_ticks(stop: threading.Event, lateness: list) -> None:
+    due = perf_counter() + UI_TICK
+    while not stop.is_set():
+        sleep(max(due - perf_counter(), 0))
+        lateness.append(perf_counter() - due)
+        due += UI_TICK
+
+
+def measure(mode: str, track: np.ndarray, args) -> dict:
+    hop = int(args.hop * FRAME_RATE)
+    capture = Capture(track, args.block, hop, args.window)
+    module = Module(capture)
+    estimates = []
+    stop = threading.Event()
+    if mode == "process":
+        analyzer = ProcessAnalyzer(module, FRAME_RATE, window_seconds=args.window, onsets=args.onsets,
+                                   engine=args.engine)
+        analyzer.add_output("count", estimates.append)
+    else:
+        from BpmAnalizer import BpmAnalyzer
+        module.audio_streamer = SharedRingReader(capture.filtered_buffer, hop, interrupted=stop.is_set)
+        analyzer = BpmAnalyzer(module, FRAME_RATE, window_seconds=args.window, onsets=args.onsets,
+                               engine=args.engine)
+        analyzer.add_output("count", estimates.append)
+    if args.auto:
+        analyzer.change_bpm_pattern(AUTO_RANGE)
+
+    ui_lateness = []
+    ticker = threading.Thread(target=ui_ticks, args=(stop, ui_lateness), daemon=True)
+    ticker.start()
+    if mode == "process":
+        analyzer.start_run_analyzer_thread(0)
+    else:
+        capture.start_stream()
+        worker = threading.Thread(target=lambda: [analyzer.analyze_step() for _ in iter(stop.is_set, True)],
+                                  daemon=True)
+        worker.start()
+    capture.thread.join()
+    stop.set()
+    if mode == "process":
+        analyzer.stop_run_analyzer_thread()
+        analyzer.close()
+    else:
+        worker.join()
+    ticker.join()
+    capture.filtered_buffer.close(unlink=True)
+
+    def stats(values):
+        values = np.array(values) * 1000
+        return {"p50": np.percentile(values, 50), "p99": np.percentile(values, 99), "max": values.max()}
+    return {"capture": stats(capture.lateness), "ui": stats(ui_lateness), "estimates": len(estimates)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Capture and UI jitter with the analysis in a thread or a process",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset envelope front end")
+    parser.add_argument("--auto", action="store_true", help="Search every range at once")
+    parser.add_argument("--block", type=int, default=512, help="Samples per capture block")
+    parser.add_argument("--hop", type=float, default=0.05, help="New audio in seconds before each analysis")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--seconds", type=float, default=15, help="Length of the run")
+    args = parser.parse_args()
+
+    track = bandpass_filter(drum_track(128, FRAME_RATE, args.seconds + args.window), FRAME_RATE)
+    print(f"{'mode':<8} {'capture late ms (p50 p99 max)':>30} {'ui late ms (p50 p99 max)':>26} {'estimates':>9}")
+    for mode in ("thread", "process"):
+        result = measure(mode, track, args)
+        capture, ui = result["capture"], result["ui"]
+        print(f"{mode:<8} {capture['p50']:10.2f} {capture['p99']:9.2f} {capture['max']:9.2f} "
+              f"{ui['p50']:8.2f} {ui['p99']:8.2f} {ui['max']:8.2f} {result['estimates']:9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+How fast a tempo change reaches the output, for a capture block, hop and window
+
+Synthetic tracks jump from one tempo to another. They are streamed block by
+block through the same streaming band-pass and ring buffer as AudioStreamer,
+and analysed whenever a hop of new audio arrived and the previous analysis
+is done; hops arriving during an analysis are coalesced like in the live
+loop. Time is simulated: each analysis takes its measured duration (times
+--load, to emulate a slower machine). The reported latency runs from the
+tempo change to the first output after which every averaged BPM is within
+the tolerance of the new tempo.
+
+Usage:
+    python3 benchmarks/latency.py                                  # Live defaults
+    python3 benchmarks/latency.py --block 512 --hop 0.25 --window 8 --target 5
+    python3 benchmarks/latency.py --engine autocorrelation --window 6 --load 20
+"""
+
+import sys
+import argparse
+from collections import deque
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from BpmAnalizer import BpmAnalyzer, TEMPO_ENGINES
+from BandpassFilter import StreamingBandpass
+from RingBuffer import RingBuffer
+from signals import GENERATORS
+
+# (range, tempo before, tempo after)
+STEPS = [("60–160", 120, 128), ("60–160", 100, 92), ("60–160", 140, 150)]
+
+
+def step_track(kind: str, before_bpm: float, after_bpm: float, frame_rate: int, before: float,
+               after: float, seed: int) -> np.ndarray:
+    """before seconds at before_bpm, then after seconds at after_bpm."""
+    generator = GENERATORS[kind]
+    return np.concatenate((generator(before_bpm, frame_rate, before, seed=seed),
+                           generator(after_bpm, frame_rate, after, seed=seed + 1)))
+
+
+def run_case(analyzer: BpmAnalyzer, track: np.ndarray, change: float, target_bpm: float, args) -> dict:
+    """Stream a track and time when the averaged output settles on target_bpm."""
+    frame_rate = analyzer.frame_rate
+    block = args.block
+    hop = int(args.hop * frame_rate) if args.hop else block
+    ring = RingBuffer(int(args.window * frame_rate), headroom=block)
+    bandpass = StreamingBandpass(frame_rate)
+    average = deque(maxlen=3)
+    outputs, computes = [], []
+    read_position, busy_until, coalesced = 0, 0.0, 0
+    for end in range(block, len(track) + 1, block):
+        ring.write(bandpass.process(track[end - block:end]))
+        now = end / frame_rate
+        if ring.position - read_position < hop or now < busy_until:
+            continue
+        buffer, position = ring.latest()
+        coalesced += max((position - read_position) // hop - 1, 0)
+        read_position = position
+        started = perf_counter()
+        estimate = analyzer.search_bpm(buffer)
+        compute = (perf_counter() - started) * args.load
+        computes.append(compute)
+        busy_until = now + compute
+        if estimate:
+            average.append(estimate[0])
+            outputs.append((busy_until, sum(average) / len(average)))
+
+    settled = None
+    for time, bpm in reversed(outputs):
+        if time < change or abs(bpm - target_bpm) > args.tolerance:
+            break
+        settled = time
+    duration = len(track) / frame_rate
+    return {
+        "latency": None if settled is None else settled - change,
+        "analysis_ms": np.percentile(computes, [50, 95]) * 1000 if computes else [0, 0],
+        "load": sum(computes) / duration,
+        "coalesced": coalesced,
+        "outputs": len(outputs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time from a tempo change to a settled output",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset envelope front end")
+    parser.add_argument("--block", type=int, default=10240, help="Samples per capture callback")
+    parser.add_argument("--hop", type=float, help="New audio in seconds before each analysis (default: one block)")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--load", type=float, default=1.0, help="Multiply analysis times, to emulate a slower machine")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Largest settled error in BPM")
+    parser.add_argument("--target", type=float, help="Latency in seconds to check every case against")
+    args = parser.parse_args()
+
+    analyzer = BpmAnalyzer(None, onsets=args.onsets, engine=args.engine)
+    before = args.window + 4
+    after = 2 * args.window + 8
+    print(f"{'case':<22} {'latency s':>9} {'p50 ms':>7} {'p95 ms':>7} {'load':>6} {'coalesced':>9}")
+    latencies = []
+    for seed, (kind, (range_key, before_bpm, after_bpm)) in enumerate(
+            (kind, step) for kind in GENERATORS for step in STEPS):
+        analyzer.change_bpm_pattern(range_key)
+        track = step_track(kind, before_bpm, after_bpm, analyzer.frame_rate, before, after, seed)
+        result = run_case(analyzer, track, before, after_bpm, args)
+        latency = result["latency"]
+        latencies.append(latency)
+        verdict = ""
+        if args.target:
+            verdict = " ✅" if latency is not None and latency <= args.target else " ❌"
+        shown = "never" if latency is None else f"{latency:.2f}"
+        p50, p95 = result["analysis_ms"]
+        print(f"{kind + f' {before_bpm}→{after_bpm}':<22} {shown:>9} {p50:7.2f} {p95:7.2f} "
+              f"{result['load']:6.3f} {result['coalesced']:9}{verdict}")
+    settled = [latency for latency in latencies if latency is not None]
+    if settled:
+        print(f"Median latency {np.median(settled):.2f} s, worst {max(settled):.2f} s, "
+              f"{len(latencies) - len(settled)} case(s) never settled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Deterministic regression runs and analysis throughput from capture recordings
+
+A recording (Daemon.py --record, RECORD_CAPTURE in App.py) is replayed
+through the live capture path and analyzer, as fast as the analyzer takes
+it, so every run analyzes the same buffers: the estimates of two runs of
+the same code are identical, and any difference after a change comes from
+the change. Throughput is measured without audio I/O.
+
+Usage:
+    python3 benchmarks/replay.py show.bpmcap --output before.json
+    python3 benchmarks/replay.py show.bpmcap --compare before.json
+    python3 benchmarks/replay.py show.bpmcap --realtime        # Paced like the capture
+    python3 benchmarks/replay.py --synthetic 128 test.bpmcap   # Write a synthetic recording first
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from AnalysisOptions import TEMPO_ENGINES, parse_range
+from BpmAnalizer import BpmAnalyzer
+from BpmStorage import BpmStorage
+from Instrumentation import Instrumentation
+from Recording import ReplayStreamer, write_recording
+from Sessions import NoLink
+from signals import drum_track
+
+
+class Module:
+    def __init__(self, audio_streamer: ReplayStreamer):
+        self.audio_streamer = audio_streamer
+        self.bpm_storage = BpmStorage()
+        self.ableton_link = NoLink()
+
+
+def run(args) -> dict:
+    instrumentation = Instrumentation()
+    streamer = ReplayStreamer(args.recording, args.window, instrumentation, args.hop, realtime=args.realtime)
+    module = Module(streamer)
+    analyzer = BpmAnalyzer(module, frame_rate=streamer.frame_rate, incremental=args.incremental,
+                           window_seconds=args.window, instrumentation=instrumentation, onsets=args.onsets,
+                           engine=args.engine)
+    analyzer.change_bpm_pattern(args.range)
+    estimates = []
+    analyzer.add_output("record", lambda bpm: estimates.append(
+        [round(streamer.read_position / streamer.frame_rate, 3), bpm]))
+
+    started = perf_counter()
+    analyzer.start_run_analyzer_thread(0)
+    streamer.finished.wait()
+    analyzer.stop_run_analyzer_thread()
+    elapsed = perf_counter() - started - 0.3  # stop_run_analyzer_thread sleeps 0.3 s
+    duration = streamer.recording.duration()
+    analysis = instrumentation.snapshot()["stages"].get("analysis", {})
+    return {
+        "recording": str(args.recording),
+        "config": {"engine": args.engine, "range": args.range, "onsets": args.onsets, "incremental": args.incremental,
+                   "hop": args.hop, "window": args.window, "realtime": args.realtime},
+        "audio_seconds": round(duration, 3),
+        "wall_seconds": round(elapsed, 3),
+        "speed": round(duration / elapsed, 1),
+        "analysis_ms": {key: analysis.get(key) for key in ("p50_ms", "p95_ms", "p99_ms")},
+        "estimates": estimates,
+    }
+
+
+def compare(before: dict, after: dict) -> int:
+    """Print where the estimates of two runs differ; the number of differences."""
+    if before["config"] != after["config"]:
+        print("⚠️  Runs used different configurations:", before["config"], after["config"])
+    old, new = dict(map(tuple, before["estimates"])), dict(map(tuple, after["estimates"]))
+    differences = 0
+    for seconds in sorted(set(old) | set(new)):
+        if old.get(seconds) != new.get(seconds):
+            differences += 1
+            print(f"{seconds:10.3f} s  {old.get(seconds)} → {new.get(seconds)}")
+    print(f"{differences} of {len(set(old) | set(new))} estimates differ; "
+          f"{before['speed']}x → {after['speed']}x real time")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a capture recording through the analyzer",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("recording", help="Capture recording (.bpmcap)")
+    parser.add_argument("--synthetic", type=float, metavar="BPM",
+                        help="First write a 60 s synthetic drum recording at this tempo to the path")
+    parser.add_argument("--range", default="60–160", help="BPM range, custom range or auto")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset envelope front end")
+    parser.add_argument("--incremental", action="store_true", help="Only analyze the audio since the previous estimate")
+    parser.add_argument("--hop", type=float, help="New audio in seconds before each analysis (default: one block)")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--realtime", action="store_true", help="Pace the replay like the capture")
+    parser.add_argument("--output", help="Save the run as JSON")
+    parser.add_argument("--compare", metavar="BEFORE", help="Compare the estimates with a saved run")
+    args = parser.parse_args()
+    args.range = parse_range(args.range)
+    if args.range is None:
+        parser.error("unknown BPM range")
+
+    if args.synthetic:
+        write_recording(args.recording, drum_track(args.synthetic, 11025, 60), 11025)
+    report = run(args)
+    print(f"{report['audio_seconds']} s of audio in {report['wall_seconds']} s ({report['speed']}x real time), "
+          f"{len(report['estimates'])} estimates, analysis p50 {report['analysis_ms']['p50_ms']} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"✅ Results saved to {args.output}")
+    if args.compare:
+        sys.exit(1 if compare(json.loads(Path(args.compare).read_text()), report) else 0)
+
+
+if __name__ == "__main__":
+    main()
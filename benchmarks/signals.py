@@ -0,0 +1,73 @@
+"""
+Synthetic test signals with known tempo, for the benchmarks
+
+All generators are deterministic for a given seed and return int16 audio
+like the blocks AudioStreamer captures.
+"""
+
+import numpy as np
+
+
+def beat_times(bpm: float, seconds: float, end_bpm: float = None) -> np.ndarray:
+    """Beat onsets in seconds, for a constant tempo or a linear ramp to end_bpm."""
+    end_bpm = bpm if end_bpm is None else end_bpm
+    times = []
+    t = 0.0
+    while t < seconds:
+        times.append(t)
+        t += 60 / (bpm + (end_bpm - bpm) * t / seconds)
+    return np.array(times)
+
+
+def tempo_at(bpm: float, seconds: float, end_bpm: float, start: float, end: float) -> float:
+    """Mean tempo of a ramp between two instants."""
+    end_bpm = bpm if end_bpm is None else end_bpm
+    middle = (start + end) / 2
+    return bpm + (end_bpm - bpm) * middle / seconds
+
+
+def to_int16(signal_array: np.ndarray) -> np.ndarray:
+    return (signal_array / np.abs(signal_array).max() * 20000).astype(np.int16)
+
+
+def click_track(bpm: float, frame_rate: int, seconds: float = 12, noise: float = 0.05,
+                end_bpm: float = None, seed: int = 0) -> np.ndarray:
+    """Short decaying clicks on every beat over white noise."""
+    rng = np.random.default_rng(seed)
+    signal_array = rng.normal(0, noise, int(frame_rate * seconds))
+    for start in (beat_times(bpm, seconds, end_bpm) * frame_rate).astype(int):
+        click = signal_array[start:start + 200]
+        click += np.exp(-np.arange(len(click)) / 30.0)
+    return to_int16(signal_array)
+
+
+def drum_track(bpm: float, frame_rate: int, seconds: float = 12, noise: float = 0.05,
+               end_bpm: float = None, seed: int = 0) -> np.ndarray:
+    """Kick on every beat, snare on beats 2 and 4, hi-hat on eighths, over white noise."""
+    rng = np.random.default_rng(seed)
+    signal_array = rng.normal(0, noise, int(frame_rate * seconds))
+    t = np.arange(int(frame_rate * 0.25)) / frame_rate
+    kick = np.sin(2 * np.pi * (50 + 100 * np.exp(-t * 30)) * t) * np.exp(-t * 12)
+    snare = rng.normal(0, 0.5, len(t)) * np.exp(-t * 25) + 0.3 * np.sin(2 * np.pi * 190 * t) * np.exp(-t * 20)
+    hihat = np.diff(rng.normal(0, 0.2, int(frame_rate * 0.05) + 1)) * np.exp(-t[:int(frame_rate * 0.05)] * 80)
+
+    def add(sound, start):
+        segment = signal_array[start:start + len(sound)]
+        segment += sound[:len(segment)]
+
+    beats = beat_times(bpm, seconds, end_bpm)
+    for i, beat in enumerate(beats):
+        start = int(beat * frame_rate)
+        add(kick, start)
+        if i % 2 == 1:
+            add(snare, start)
+        add(hihat, start)
+        if i + 1 < len(beats):
+            add(hihat, int((beat + beats[i + 1]) / 2 * frame_rate))
+    return to_int16(signal_array)
+
+
+GENERATORS = {
+    "click": click_track,
+    "drums": drum_track,
+}
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Reproducible end-to-end benchmark of the BPM analysis, without audio hardware
+
+Synthetic click and drum tracks of known tempo are analysed over every BPM
+range, at several noise levels and with tempo ramps, in sliding windows like
+the live analyzer. Reports per-stage latency percentiles, estimates per
+second, peak RSS, memory held by the tempo engine and detection error, and
+saves everything as JSON so two runs (e.g. of two engines) can be compared.
+
+Usage:
+    python3 benchmarks/suite.py                          # Full suite, results.json
+    python3 benchmarks/suite.py --quick --output a.json
+    python3 benchmarks/suite.py --auto                   # Automatic range selection
+    python3 benchmarks/suite.py --onsets                 # Onset envelope front end
+    python3 benchmarks/suite.py --engine autocorrelation # FFT engine, no pattern files
+    python3 benchmarks/suite.py --compare a.json b.json  # Diff two saved runs
+"""
+
+import sys
+import json
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from BpmAnalizer import BpmAnalyzer, BPM_RANGES, AUTO_RANGE, TEMPO_ENGINES
+from signals import GENERATORS, tempo_at
+
+STAGES = ["filter", "events", "coarse", "fine", "search"]
+NOISE_LEVELS = [0.05, 0.2, 0.5]
+RAMP = 1.04  # Ramped tracks end 4 % faster than they start
+# Half, double and triple/duple confusions
+OCTAVE_RATIOS = [0.5, 2.0, 2 / 3, 1.5]
+
+
+def peak_rss_mib() -> float:
+    """Peak resident set size of this process, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def tempos_for(range_key: str, count: int) -> list:
+    """count tempos spread inside a BPM range, away from its edges."""
+    start, width = BPM_RANGES[range_key]
+    return [round(start + width * (i + 0.5) / count, 2) for i in range(count)]
+
+
+def cases(quick: bool) -> list:
+    noise_levels = NOISE_LEVELS[:2] if quick else NOISE_LEVELS
+    tempo_count = 2 if quick else 4
+    return [
+        {"range": range_key, "kind": kind, "bpm": bpm, "noise": noise, "ramp": ramp}
+        for range_key in BPM_RANGES
+        for kind in GENERATORS
+        for bpm in tempos_for(range_key, tempo_count)
+        for noise in noise_levels
+        for ramp in (False, True)
+    ]
+
+
+def percentiles(timings: list) -> dict:
+    if not timings:
+        return {}
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3),
+            "mean": round(float(np.mean(timings)), 3), "count": len(timings)}
+
+
+def classify(estimate: float, truth: float, tolerance: float) -> str:
+    if not estimate:
+        return "missed"
+    if abs(estimate - truth) <= tolerance:
+        return "correct"
+    if any(abs(estimate - truth * ratio) <= tolerance * ratio for ratio in OCTAVE_RATIOS):
+        return "octave"
+    return "wrong"
+
+
+def run_case(analyzer: BpmAnalyzer, case: dict, args, timings: dict, seed: int) -> dict:
+    """Analyse one synthetic track in sliding windows and score each estimate."""
+    frame_rate = analyzer.frame_rate
+    end_bpm = case["bpm"] * RAMP if case["ramp"] else None
+    track = GENERATORS[case["kind"]](case["bpm"], frame_rate, args.seconds, case["noise"], end_bpm, seed)
+    window = int(args.window * frame_rate)
+    hop = int(args.hop * frame_rate)
+
+    stage = {}
+
+    def votes(bpm_pattern, steps):
+        started = perf_counter()
+        bpm_container = analyzer.bpm_container(beat_events, bpm_pattern, steps, weights)
+        stage["coarse" if bpm_pattern is analyzer.bpm_pattern else "fine"] = (perf_counter() - started) * 1000
+        return bpm_container
+
+    outcomes = {"correct": 0, "octave": 0, "wrong": 0, "missed": 0}
+    errors = []
+    for start in range(0, len(track) - window + 1, hop):
+        stage.clear()
+        started = perf_counter()
+        buffer = analyzer.bandpass_filter(track[start:start + window])
+        stage["filter"] = (perf_counter() - started) * 1000
+
+        if analyzer.estimator.uses_patterns:
+            started = perf_counter()
+            beat_events, weights = analyzer.detect_beat_events(buffer)
+            stage["events"] = (perf_counter() - started) * 1000
+
+            started = perf_counter()
+            bpm_float_str = analyzer.search_bpm_votes(votes, beat_events, weights)
+            stage["search"] = stage["events"] + (perf_counter() - started) * 1000
+        else:
+            started = perf_counter()
+            bpm_float_str = analyzer.search_bpm(buffer)
+            stage["search"] = (perf_counter() - started) * 1000
+
+        for name, elapsed in stage.items():
+            timings[name].append(elapsed)
+
+        truth = tempo_at(case["bpm"], args.seconds, end_bpm, start / frame_rate, (start + window) / frame_rate)
+        estimate = bpm_float_str[0] if bpm_float_str else 0
+        outcomes[classify(estimate, truth, args.tolerance)] += 1
+        if estimate:
+            errors.append(abs(estimate - truth))
+
+    windows = sum(outcomes.values())
+    return dict(case, **outcomes, windows=windows,
+                accuracy=round(outcomes["correct"] / windows, 3) if windows else None,
+                mean_abs_error=round(float(np.mean(errors)), 3) if errors else None)
+
+
+def summarise(results: list) -> dict:
+    windows = sum(r["windows"] for r in results)
+    summary = {k: sum(r[k] for r in results) for k in ("correct", "octave", "wrong", "missed")}
+    summary["windows"] = windows
+    summary["accuracy"] = round(summary["correct"] / windows, 3) if windows else None
+    # Mean absolute error over the windows with an estimate, whatever their outcome
+    weighted = [(r["mean_abs_error"], r["windows"] - r["missed"]) for r in results if r["mean_abs_error"] is not None]
+    estimated = sum(count for _, count in weighted)
+    summary["mean_abs_error"] = round(sum(e * count for e, count in weighted) / estimated, 3) if estimated else None
+    return summary
+
+
+def run(args) -> dict:
+    analyzer = BpmAnalyzer(None, onsets=args.onsets, engine=args.engine)
+    timings = {name: [] for name in STAGES}
+    results = []
+    range_key = None
+    started = perf_counter()
+    for seed, case in enumerate(cases(args.quick)):
+        if (AUTO_RANGE if args.auto else case["range"]) != range_key:
+            range_key = AUTO_RANGE if args.auto else case["range"]
+            analyzer.change_bpm_pattern(range_key)
+        results.append(run_case(analyzer, case, args, timings, seed))
+        print(f"⏳ {len(results)} cases", end="\r", file=sys.stderr)
+    elapsed = perf_counter() - started
+    print(file=sys.stderr)
+
+    estimates = len(timings["search"])
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "machine": platform.machine()},
+        "config": {"quick": args.quick, "auto": args.auto, "onsets": args.onsets, "engine": args.engine, "seconds": args.seconds, "window": args.window,
+                   "hop": args.hop, "tolerance": args.tolerance, "frame_rate": analyzer.frame_rate},
+        "latency_ms": {name: percentiles(timings[name]) for name in STAGES},
+        "estimates_per_s": round(estimates / elapsed, 1),
+        "peak_rss_mib": peak_rss_mib(),
+        "engine_kib": round(analyzer.estimator.nbytes() / 1024, 1),
+        "detection": {
+            "overall": summarise(results),
+            **{f"range {key}": summarise([r for r in results if r["range"] == key]) for key in BPM_RANGES},
+            **{f"kind {kind}": summarise([r for r in results if r["kind"] == kind]) for kind in GENERATORS},
+            **{f"noise {noise}": summarise([r for r in results if r["noise"] == noise])
+               for noise in sorted({r["noise"] for r in results})},
+            "steady": summarise([r for r in results if not r["ramp"]]),
+            "ramp": summarise([r for r in results if r["ramp"]]),
+        },
+        "cases": results,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{'stage':<8} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for name, stats in report["latency_ms"].items():
+        if stats:
+            print(f"{name:<8} {stats['p50']:9.3f} {stats['p95']:9.3f} {stats['p99']:9.3f}")
+    print(f"{report['estimates_per_s']} estimates/s, peak RSS {report['peak_rss_mib']} MiB, "
+          f"engine {report.get('engine_kib')} KiB")
+    print(f"{'':<18} {'accuracy':>8} {'error':>7} {'octave':>7} {'wrong':>6} {'missed':>7} {'windows':>8}")
+    for name, summary in report["detection"].items():
+        print(f"{name:<18} {summary['accuracy']:8.3f} {summary['mean_abs_error']:7.2f} {summary['octave']:7} "
+              f"{summary['wrong']:6} {summary['missed']:7} {summary['windows']:8}")
+
+
+def compare(before: dict, after: dict) -> None:
+    """Print the change of every summary metric between two saved runs."""
+    def change(name, old, new, unit=""):
+        if old is None or new is None:
+            return
+        relative = f" ({(new - old) / old * 100:+.1f} %)" if old else ""
+        print(f"{name:<28} {old:>10} → {f'{new}{unit}':<14}{relative}")
+
+    for name in STAGES:
+        old, new = before["latency_ms"].get(name, {}), after["latency_ms"].get(name, {})
+        for key in ("p50", "p95", "p99"):
+            change(f"{name} {key} ms", old.get(key), new.get(key))
+    change("estimates/s", before["estimates_per_s"], after["estimates_per_s"])
+    change("peak RSS MiB", before["peak_rss_mib"], after["peak_rss_mib"])
+    change("engine KiB", before.get("engine_kib"), after.get("engine_kib"))
+    for name, summary in after["detection"].items():
+        if name in before["detection"]:
+            change(f"{name} accuracy", before["detection"][name]["accuracy"], summary["accuracy"])
+            change(f"{name} error", before["detection"][name]["mean_abs_error"], summary["mean_abs_error"], " BPM")
+    if before["config"] != after["config"]:
+        print("⚠️  Runs used different configurations:", before["config"], after["config"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark BPM detection on synthetic tracks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--output", default="results.json", help="Where to save the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved runs")
+    parser.add_argument("--quick", action="store_true", help="Fewer tempos and noise levels")
+    parser.add_argument("--auto", action="store_true", help="Search every range at once instead of the case's range")
+    parser.add_argument("--onsets", action="store_true", help="Use the onset envelope front end")
+    parser.add_argument("--engine", type=str.capitalize, choices=TEMPO_ENGINES, default=TEMPO_ENGINES[0],
+                        help="Tempo engine (case-insensitive)")
+    parser.add_argument("--seconds", type=float, default=24, help="Length of each synthetic track")
+    parser.add_argument("--window", type=float, default=12, help="Analysis window in seconds")
+    parser.add_argument("--hop", type=float, default=1, help="Hop between windows in seconds")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Largest correct error in BPM")
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.loads(Path(p).read_text()) for p in args.compare)
+        compare(before, after)
+        return
+
+    report = run(args)
+    print_report(report)
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the tempo voting passes of BpmAnalyzer.search_bpm
+
+Usage:
+    python3 benchmarks/voting.py               # 200 calls per pass
+    python3 benchmarks/voting.py --calls 1000
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from BpmAnalizer import BpmAnalyzer
+from signals import click_track
+
+
+def measure(function, calls: int) -> np.ndarray:
+    """Per-call latency of function in milliseconds."""
+    timings = np.zeros(calls)
+    for i in range(calls):
+        started = perf_counter()
+        function()
+        timings[i] = (perf_counter() - started) * 1000
+    return timings
+
+
+def report(name: str, timings: np.ndarray) -> None:
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(f"{name:<20} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms   p99 {p99:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the coarse and fine voting passes")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per pass")
+    parser.add_argument("--bpm", type=float, default=128.0, help="Tempo of the synthetic click track")
+    args = parser.parse_args()
+
+    analyzer = BpmAnalyzer(None)
+    buffer = analyzer.bandpass_filter(click_track(args.bpm, analyzer.frame_rate))
+    beat_events = analyzer.search_beat_events(buffer, analyzer.frame_rate)
+
+    coarse_steps = analyzer.coarse_steps
+    coarse = analyzer.bpm_pattern
+    final = analyzer.finalise_bpm_container(analyzer.bpm_container(beat_events, coarse, coarse_steps), coarse_steps)
+    start, end = analyzer.get_bpm_pattern_fine_window(analyzer.get_bpm_wrapped(final))
+    fine = analyzer.bpm_pattern_fine[start:end]
+
+    def coarse_pass():
+        analyzer.finalise_bpm_container(analyzer.bpm_container(beat_events, coarse, coarse_steps), coarse_steps)
+
+    def fine_pass():
+        analyzer.finalise_bpm_container(analyzer.bpm_container(beat_events, fine, 40), 40)
+
+    print(f"{beat_events.size} beat events, {args.calls} calls per pass")
+    report(f"coarse ({coarse_steps} steps)", measure(coarse_pass, args.calls))
+    report("fine (40 steps)", measure(fine_pass, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -305,10 +305,17 @@ class BpmAnalyzerBuilder:
             if exe_path.exists():
                 # Check if it's a ZIP file (onefile builds are compressed)
                 with zipfile.ZipFile(exe_path, 'r') as z:
-                    files = z.namelist()
-                    pattern_files = [f for f in files if 'pattern' in f and '.npy' in f]
-                    if pattern_files:
-                        self.print_success(f"  ✓ {len(pattern_files)} pattern files included in bundle")
+                    files = set(z.namelist())
+                    # PatternStore names tables coarse_<key>.npy / fine_<key>.npy, each with a .json checksum
+                    tables = [f for f in files
+                              if 'patterns/' in f and f.endswith('.npy')
+                              and Path(f).name.startswith(('coarse_', 'fine_'))]
+                    unchecked = [f for f in tables if f[:-len('.npy')] + '.json' not in files]
+                    if tables and not unchecked:
+                        self.print_success(f"  ✓ {len(tables)} pattern tables and checksums included in bundle")
+                    elif tables:
+                        self.print_warning(f"  ⚠ {len(unchecked)} pattern tables lack their .json checksum "
+                                           f"and will be rebuilt at startup")
                     else:
                         self.print_warning(f"  ⚠ Pattern files may not be included (check _internal/patterns/)")
         except Exception: